@@ -0,0 +1,82 @@
+"""
+过滤引擎基准测试
+生成随机的飞书申请记录，对比单遍 过滤引擎 与原先依次执行四个过滤器（tests/baseline_filters.py，
+改写前 filters.py 的原样副本）的耗时。两者结果一致由 tests/test_过滤引擎.py 保证
+
+用法: python scripts/bench_filters.py [记录数，默认100000]
+"""
+
+import importlib.util
+import random
+import sys
+import time
+import types
+from pathlib import Path
+
+import nonebot
+
+nonebot.init(log_level="WARNING")
+
+_根目录 = Path(__file__).resolve().parent.parent
+_源码目录 = _根目录 / "src"
+
+
+def _加载(name, path):
+    # 按文件加载模块，不执行插件包的 __init__（避免注册匹配器和定时任务）
+    spec = importlib.util.spec_from_file_location(name, path)
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[name] = module
+    spec.loader.exec_module(module)
+    return module
+
+
+for package in ("src", "src.utils", "src.plugins", "src.plugins.feishu", "src.plugins.qq"):
+    module = types.ModuleType(package)
+    module.__path__ = [str(_源码目录.joinpath(*package.split(".")[1:]))]
+    sys.modules[package] = module
+记录 = _加载("src.plugins.feishu.记录", _源码目录 / "plugins" / "feishu" / "记录.py")
+filters = _加载("src.plugins.qq.filters", _源码目录 / "plugins" / "qq" / "filters.py")
+baseline_filters = _加载("baseline_filters", _根目录 / "tests" / "baseline_filters.py")
+
+
+def 生成记录(n, seed=1):
+    rng = random.Random(seed)
+    items = []
+    for i in range(n):
+        fields = {"总分": {"type": 2, "value": [80]}}
+        if rng.random() > 0.02:
+            fields["QQ号码"] = [{"type": "text", "text": str(rng.randint(10000, 10000 + n // 2))}]
+        if rng.random() < 0.1:
+            game_id = rng.choice([f"Steve_{rng.randint(0, n // 2)}", "bad id!", "ab", "x" * 20])
+        else:
+            game_id = f"Player_{rng.randint(0, n // 2)}"
+        fields["游戏ID"] = [{"type": "text", "text": game_id}]
+        items.append({"record_id": f"rec{i}", "created_time": rng.randint(0, 10**6), "fields": fields})
+    return items
+
+
+def 四遍过滤(items):
+    """原先的实现：四个过滤器依次各遍历一次原始记录，再逐条提取用户信息"""
+    return [baseline_filters.extract_user_info(item) for item in baseline_filters.apply_filters(items)]
+
+
+def 单遍过滤(items):
+    """现在的实现：解析一次记录后单遍过滤"""
+    return filters.过滤引擎().输入(记录.解析记录(items)).结果()
+
+
+def 计时(func, items, repeat=5):
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func(items)
+        best = min(best, time.perf_counter() - started)
+    return best * 1000
+
+
+if __name__ == "__main__":
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    items = 生成记录(n)
+    for func in (四遍过滤, 单遍过滤):
+        print(f"{func.__name__}: {计时(func, items):.1f} ms")
+    print(f"保留 {len(单遍过滤(items))} 条，共 {n} 条")
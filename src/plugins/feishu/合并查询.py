@@ -0,0 +1,73 @@
+"""
+QQ号查询合并模块
+短时间内到达的多个QQ号查询合并为一次 records/search 请求，结果再分发给各个等待方
+"""
+
+import asyncio
+
+import nonebot
+from nonebot import logger
+
+config = nonebot.get_driver().config
+
+_合并窗口 = float(getattr(config, "feishu_lookup_batch_window", 0.2))  # 秒
+# 飞书筛选条件数量上限
+_最大条件数 = min(int(getattr(config, "feishu_lookup_batch_size", 50)), 50)
+
+
+class QQ合并查询:
+    """
+    QQ号查询合并器
+
+    第一个查询到达后等待一个合并窗口，窗口内到达的QQ号一起用 or 条件查询；
+    待查询的QQ号达到条件数上限时立即发出请求。同一QQ号的重复查询共享同一个结果。
+
+    Args:
+        加载 (callable): 接收QQ号列表、返回 {QQ号: 记录列表} 的协程函数
+        window (float): 合并窗口秒数，默认使用配置 feishu_lookup_batch_window
+        max_size (int): 单次请求的最大QQ号数量，默认使用配置 feishu_lookup_batch_size
+    """
+
+    def __init__(self, 加载, window=_合并窗口, max_size=_最大条件数):
+        self._加载 = 加载
+        self.window = window
+        self.max_size = max_size
+        self._待查询 = {}  # {qq: Future}
+        self._定时器 = None
+
+    async def 查询(self, qq_number):
+        """
+        查询QQ号的全部记录
+
+        Returns:
+            list | None: 记录列表，查询失败时返回 None
+        """
+        qq_number = str(qq_number)
+        future = self._待查询.get(qq_number)
+        if future is None:
+            future = asyncio.get_running_loop().create_future()
+            self._待查询[qq_number] = future
+            if len(self._待查询) >= self.max_size:
+                self._发出()
+            elif self._定时器 is None:
+                self._定时器 = asyncio.get_running_loop().call_later(self.window, self._发出)
+        return await asyncio.shield(future)
+
+    def _发出(self):
+        if self._定时器 is not None:
+            self._定时器.cancel()
+            self._定时器 = None
+        batch, self._待查询 = self._待查询, {}
+        if batch:
+            asyncio.ensure_future(self._执行(batch))
+
+    async def _执行(self, batch):
+        logger.debug(f"合并查询 {len(batch)} 个QQ号: {list(batch)}")
+        try:
+            found = await self._加载(list(batch))
+        except Exception as e:
+            logger.warning(f"合并查询 {len(batch)} 个QQ号失败: {e}")
+            found = None
+        for qq_number, future in batch.items():
+            if not future.done():
+                future.set_result(None if found is None else found.get(qq_number, []))
@@ -0,0 +1,164 @@
+"""
+飞书HTTP客户端模块
+通过共享HTTP客户端发送飞书请求，请求按QPS限速，遇到限流或临时错误时按指数退避重试
+"""
+
+import asyncio
+import random
+import time
+
+import httpx
+import nonebot
+from nonebot import logger
+
+from ...utils.客户端工具 import 共享客户端
+
+config = nonebot.get_driver().config
+
+BASE_URL = "https://open.feishu.cn/open-apis"
+
+_QPS = float(getattr(config, "feishu_qps", 10))  # 多维表格接口文档限制为 20 QPS，默认留一半余量
+_最大重试次数 = int(getattr(config, "feishu_max_retries", 5))
+_退避基数 = 0.5  # 秒
+_退避上限 = 30.0  # 秒
+
+# 限流与可重试的临时错误码
+_可重试错误码 = frozenset({
+    99991400,  # 应用请求频率超限
+    1254290,  # TooManyRequest
+    1254291,  # 写冲突
+    1254607,  # 数据未就绪
+    1255040,  # 请求超时
+})
+
+# token无效（被吊销、App Secret 已更换等），换新token后可以重试
+_token无效错误码 = frozenset({
+    99991661,  # 缺少或格式错误的 access token
+    99991663,  # tenant access token 无效
+    99991668,  # user access token 无效
+})
+
+_客户端 = 共享客户端(
+    "飞书",
+    base_url=BASE_URL,
+    headers={"Content-Type": "application/json; charset=utf-8"},
+    timeout=httpx.Timeout(float(getattr(config, "feishu_http_timeout", 15))),
+)
+_限速锁 = None
+_下次可用时间 = 0.0
+
+
+class 飞书请求失败(Exception):
+    """重试耗尽后仍然失败的飞书请求"""
+
+    def __init__(self, message, result=None):
+        super().__init__(message)
+        self.result = result
+
+    @property
+    def 可重试(self):
+        """是否为限流、网络等临时错误；为 False 时请求本身有误（如字段不存在），重试也不会成功"""
+        return self.result is None or self.result.get("code") in _可重试错误码
+
+
+def 获取客户端():
+    """
+    获取共享的飞书异步HTTP客户端（首次调用时创建）
+
+    Returns:
+        httpx.AsyncClient: 启用keep-alive连接池的客户端
+    """
+    return _客户端.获取()
+
+
+async def _等待配额():
+    """按 feishu_qps 均匀分配请求时间片，并发请求依次排队"""
+    global _限速锁, _下次可用时间
+    if _QPS <= 0:
+        return
+    if _限速锁 is None:
+        _限速锁 = asyncio.Lock()
+    async with _限速锁:
+        now = time.monotonic()
+        wait = _下次可用时间 - now
+        _下次可用时间 = max(now, _下次可用时间) + 1 / _QPS
+    if wait > 0:
+        await asyncio.sleep(wait)
+
+
+def _退避秒数(attempt, response=None):
+    # 服务端给出了重置时间时以其为准，否则使用带全抖动的指数退避
+    if response is not None:
+        for header in ("Retry-After", "x-ogw-ratelimit-reset"):
+            value = response.headers.get(header)
+            if value:
+                try:
+                    return min(float(value), _退避上限)
+                except ValueError:
+                    pass
+    return random.uniform(0, min(_退避上限, _退避基数 * 2 ** attempt))
+
+
+def _携带token(kwargs):
+    return str((kwargs.get("headers") or {}).get("Authorization", "")).startswith("Bearer ")
+
+
+async def _更换token(headers):
+    # 延迟导入：密钥管理 通过本模块请求token
+    from .密钥管理 import token_manager
+
+    await token_manager.invalidate(headers["Authorization"][len("Bearer "):])
+    token = await token_manager.get_access_token()
+    return {**headers, "Authorization": f"Bearer {token}"}
+
+
+async def 请求(method, url, **kwargs):
+    """
+    发送飞书开放平台请求并解析JSON
+
+    请求前按 feishu_qps 限速；HTTP 429/5xx、网络错误以及限流类错误码
+    会按指数退避重试，最多重试 feishu_max_retries 次。携带的token被判定无效时，
+    使其失效并换新token重试一次。其他业务错误码原样返回。
+
+    Args:
+        method (str): HTTP方法
+        url (str): 相对于 BASE_URL 的路径
+        **kwargs: 传给 httpx 的其他参数
+
+    Returns:
+        dict: 响应JSON
+
+    Raises:
+        飞书请求失败: 重试耗尽后仍然失败时抛出
+    """
+    attempt = 0
+    token_renewed = False
+    while True:
+        await _等待配额()
+        response = None
+        try:
+            response = await 获取客户端().request(method, url, **kwargs)
+            if response.status_code == 429 or response.status_code >= 500:
+                reason = f"HTTP {response.status_code}"
+                result = None
+            else:
+                result = response.json()
+                if result.get("code") in _token无效错误码 and not token_renewed and _携带token(kwargs):
+                    token_renewed = True
+                    logger.warning(f"飞书请求 {url} 的token无效（错误码 {result.get('code')}），更换token后重试")
+                    kwargs["headers"] = await _更换token(kwargs["headers"])
+                    continue
+                if result.get("code") not in _可重试错误码:
+                    return result
+                reason = f"错误码 {result.get('code')}: {result.get('msg')}"
+        except (httpx.TransportError, ValueError) as e:
+            reason = f"{type(e).__name__}: {e}"
+            result = None
+
+        if attempt >= _最大重试次数:
+            raise 飞书请求失败(f"飞书请求 {url} 重试 {attempt} 次后仍然失败，{reason}", result)
+        delay = _退避秒数(attempt, response)
+        attempt += 1
+        logger.warning(f"飞书请求 {url} 失败（{reason}），{delay:.1f} 秒后第 {attempt} 次重试")
+        await asyncio.sleep(delay)
+
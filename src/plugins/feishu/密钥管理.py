@@ -1,48 +1,62 @@
+import asyncio
 import nonebot
-import requests
 import time
 import json
 import os
+from nonebot import logger
+from .客户端 import 请求
 
 
-
-config = nonebot.get_driver().config
+driver = nonebot.get_driver()
+config = driver.config
 APP_ID = config.feishu_app_id  # 替换为你的App ID
 APP_SECRET = config.feishu_app_secret  # 替换为你的App Secret
+# 启动时解析为绝对路径，避免运行中工作目录变化导致读写不同的文件
+TOKEN_FILE = os.path.abspath(getattr(config, "feishu_token_file", "token.json"))
+REFRESH_AHEAD = 60  # 距过期不足该秒数时视为失效
+RENEW_AHEAD = 300  # 后台续期提前的秒数
+
+
 class FeishuTokenManager:
     """
     飞书开放平台Token管理器
 
     用于获取和管理飞书自建应用的tenant_access_token，
-    支持自动刷新和本地缓存功能。
+    支持单飞刷新、过期前后台续期和本地缓存功能。
+    进程内应共享同一个实例（见模块级 token_manager）。
 
     使用方法:
-    1. 创建实例: manager = FeishuTokenManager("your_app_id", "your_app_secret")
-    2. 获取token: token = manager.get_access_token()
-    3. 在请求中使用: headers = {"Authorization": f"Bearer {token}"}
+    1. 获取token: token = await token_manager.get_access_token()
+    2. 在请求中使用: headers = {"Authorization": f"Bearer {token}"}
     """
 
-    def __init__(self):
+    def __init__(self, app_id=APP_ID, app_secret=APP_SECRET, token_file=TOKEN_FILE):
         """
         初始化Token管理器
 
         Args:
             app_id (str): 飞书应用的App ID
             app_secret (str): 飞书应用的App Secret
+            token_file (str): token缓存文件路径
         """
-        self.app_id = APP_ID
-        self.app_secret = APP_SECRET
+        self.app_id = app_id
+        self.app_secret = app_secret
         self.access_token = None
         self.expires_at = 0
-        self.token_file = "token.json"
+        self.token_file = token_file
+        self._lock = None
+        self._renew_task = None
         self.load_token_from_file()
 
-    def get_access_token(self):
+    def is_valid(self):
+        return bool(self.access_token) and time.time() < self.expires_at - REFRESH_AHEAD
+
+    async def get_access_token(self):
         """
         获取有效的tenant_access_token
 
-        自动检查现有token是否有效，如果无效或即将过期则请求新token。
-        Token默认提前1分钟刷新以确保连续性。
+        token有效时直接返回内存中的值；失效时只有一个协程请求新token，
+        其他并发调用等待同一次刷新的结果。
 
         Returns:
             str: 有效的tenant_access_token
@@ -50,44 +64,86 @@ class FeishuTokenManager:
         Raises:
             Exception: 当获取token失败时抛出异常
         """
-        # 检查现有token是否有效
-        if self.access_token and time.time() < self.expires_at - 60:  # 提前1分钟刷新
+        if self.is_valid():
+            self._ensure_renewal()
             return self.access_token
 
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        async with self._lock:
+            # 等锁期间其他协程可能已经完成刷新
+            if not self.is_valid():
+                await self._refresh()
+        self._ensure_renewal()
+        return self.access_token
+
+    async def invalidate(self, token=None):
+        """
+        标记token失效（例如接口返回token无效时），下次获取时重新请求
+
+        Args:
+            token (str, optional): 调用方使用的token，与当前token不同时说明已刷新过，忽略
+        """
+        if token is None or token == self.access_token:
+            self.access_token = None
+            self.expires_at = 0
+
+    async def _refresh(self):
         # 请求新的access_token
-        url = "https://open.feishu.cn/open-apis/auth/v3/tenant_access_token/internal/"
-        headers = {"Content-Type": "application/json; charset=utf-8"}
+        url = "/auth/v3/tenant_access_token/internal/"
         data = {"app_id": self.app_id, "app_secret": self.app_secret}
 
-        response = requests.post(url, headers=headers, data=json.dumps(data))
-        result = response.json()
+        result = await 请求("POST", url, content=json.dumps(data))
 
         if result.get("code") == 0:
             self.access_token = result.get("tenant_access_token")
             expires_in = result.get("expire", 7200)  # 默认2小时
             self.expires_at = time.time() + expires_in
+            logger.debug(f"飞书access_token已刷新，有效期 {expires_in} 秒")
 
-            # 保存到文件
-            self.save_token_to_file()
-
-            return self.access_token
+            # 在线程中写文件，不阻塞事件循环
+            await asyncio.to_thread(self.save_token_to_file)
         else:
             raise Exception(f"获取access_token失败: {result.get('msg')}")
 
+    def _ensure_renewal(self):
+        if self._renew_task is None or self._renew_task.done():
+            self._renew_task = asyncio.create_task(self._renew_before_expiry())
+
+    async def _renew_before_expiry(self):
+        """
+        在token过期前后台续期，热路径上的获取始终命中内存
+
+        每轮按最新的过期时间计算等待时长，token被其他路径刷新后会自动顺延。
+        """
+        while True:
+            delay = self.expires_at - RENEW_AHEAD - time.time()
+            await asyncio.sleep(max(delay, 1))
+            if self._lock is None:
+                self._lock = asyncio.Lock()
+            try:
+                async with self._lock:
+                    if time.time() >= self.expires_at - RENEW_AHEAD:
+                        await self._refresh()
+            except Exception as e:
+                logger.warning(f"后台续期access_token失败，将在下次获取时重试: {e}")
+                await asyncio.sleep(30)
+
     def save_token_to_file(self):
         """
         将token信息保存到本地文件
 
-        保存access_token、过期时间和更新时间到JSON文件中，
-        以便在程序重启后可以复用未过期的token。
+        先写入临时文件再原子替换，避免进程中断时留下损坏的文件。
         """
         token_data = {
             "access_token": self.access_token,
             "expires_at": self.expires_at,
             "updated_at": time.time(),
         }
-        with open(self.token_file, "w", encoding="utf-8") as f:
+        tmp_file = f"{self.token_file}.tmp"
+        with open(tmp_file, "w", encoding="utf-8") as f:
             json.dump(token_data, f)
+        os.replace(tmp_file, self.token_file)
 
     def load_token_from_file(self):
         """
@@ -102,10 +158,19 @@ class FeishuTokenManager:
                     token_data = json.load(f)
 
                 # 检查token是否仍然有效
-                if token_data.get("expires_at", 0) > time.time() + 60:
+                if token_data.get("expires_at", 0) > time.time() + REFRESH_AHEAD:
                     self.access_token = token_data.get("access_token")
                     self.expires_at = token_data.get("expires_at")
             except Exception as e:
-                print(f"加载token文件失败: {e}")
+                logger.warning(f"加载token文件失败: {e}")
+
+
+# 进程内共享的token管理器
+token_manager = FeishuTokenManager()
 
 
+@driver.on_shutdown
+async def _停止续期():
+    task = token_manager._renew_task
+    if task is not None and not task.done():
+        task.cancel()
@@ -0,0 +1,176 @@
+"""
+飞书多维表格本地镜像模块
+将白名单申请表同步到本地SQLite，查询走本地索引，不再每次请求飞书
+"""
+
+import json
+import os
+import time
+from datetime import datetime, timedelta
+
+import nonebot
+
+from ...utils.数据库工具 import SQLite数据库
+from .记录 import 申请记录
+
+config = nonebot.get_driver().config
+
+DB_FILE = os.path.abspath(getattr(config, "feishu_mirror_db", os.path.join("data", "feishu_mirror.db")))
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS records (
+    record_id     TEXT PRIMARY KEY,
+    qq            TEXT NOT NULL DEFAULT '',
+    game_id       TEXT NOT NULL DEFAULT '',
+    score         REAL,
+    submitted_at  INTEGER,
+    created_time  INTEGER NOT NULL DEFAULT 0,
+    last_modified INTEGER NOT NULL DEFAULT 0,
+    synced_at     REAL NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS idx_records_qq ON records (qq);
+CREATE INDEX IF NOT EXISTS idx_records_game_id ON records (game_id COLLATE NOCASE);
+CREATE INDEX IF NOT EXISTS idx_records_submitted_score ON records (submitted_at, score);
+CREATE TABLE IF NOT EXISTS meta (
+    key   TEXT PRIMARY KEY,
+    value TEXT
+);
+"""
+
+_COLUMNS = "record_id, qq, game_id, score, submitted_at, created_time"
+
+
+def _记录转行(item, synced_at):
+    record = 申请记录.从飞书记录(item)
+    return (
+        record.record_id,
+        record.qq,
+        record.game_id,
+        record.score,
+        record.submitted_at,
+        record.created_time,
+        item.get("last_modified_time") or record.created_time,
+        synced_at,
+    )
+
+
+def _行转记录(row):
+    return 申请记录(*row)
+
+
+class 本地镜像:
+    """
+    申请表本地镜像
+
+    所有数据库操作在线程中执行并串行化，不阻塞事件循环。
+    水位线记录已同步记录的最大修改时间，增量同步只拉取之后修改过的记录。
+    """
+
+    def __init__(self, db_file=DB_FILE):
+        self.db_file = db_file
+        self._db = SQLite数据库(db_file, _SCHEMA)
+
+    async def 读取元数据(self, key, default=None):
+        def _read(conn, key):
+            row = conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+            return json.loads(row[0]) if row else default
+        return await self._db.执行(_read, key)
+
+    async def 写入元数据(self, key, value):
+        def _write(conn, key, value):
+            with conn:
+                conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (key, json.dumps(value)))
+        await self._db.执行(_write, key, value)
+
+    async def 写入记录(self, items):
+        """
+        批量写入（插入或更新）飞书记录
+
+        Returns:
+            int: 本批记录中最大的修改时间
+        """
+        synced_at = time.time()
+        rows = [_记录转行(item, synced_at) for item in items if item.get("record_id")]
+        if not rows:
+            return 0
+
+        def _write(conn, rows):
+            with conn:
+                conn.executemany(
+                    "INSERT OR REPLACE INTO records "
+                    "(record_id, qq, game_id, score, submitted_at, created_time, last_modified, synced_at) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                    rows,
+                )
+        await self._db.执行(_write, rows)
+        return max(row[6] for row in rows)
+
+    async def 删除未同步记录(self, before):
+        """删除在某次全量同步中没有出现的记录（即飞书中已删除的记录）"""
+        def _delete(conn, before):
+            with conn:
+                return conn.execute("DELETE FROM records WHERE synced_at < ?", (before,)).rowcount
+        return await self._db.执行(_delete, before)
+
+    async def 查询昨日提交(self, min_score=74):
+        """
+        查询昨日提交且总分大于 min_score 的记录
+
+        Returns:
+            list: 申请记录列表
+        """
+        today = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+        start = int((today - timedelta(days=1)).timestamp() * 1000)
+        end = int(today.timestamp() * 1000)
+
+        def _query(conn):
+            return conn.execute(
+                f"SELECT {_COLUMNS} FROM records "
+                "WHERE submitted_at >= ? AND submitted_at < ? AND score > ? "
+                "ORDER BY submitted_at",
+                (start, end, min_score),
+            ).fetchall()
+        return [_行转记录(row) for row in await self._db.执行(_query)]
+
+    async def 根据QQ号查询(self, qq_number):
+        """
+        查询QQ号的全部记录（按创建时间从新到旧）
+
+        Returns:
+            list: 申请记录列表
+        """
+        def _query(conn, qq):
+            return conn.execute(
+                f"SELECT {_COLUMNS} FROM records WHERE qq = ? ORDER BY created_time DESC", (qq,)
+            ).fetchall()
+        return [_行转记录(row) for row in await self._db.执行(_query, str(qq_number))]
+
+    async def 查询映射(self, synced_since=None):
+        """
+        查询记录的 (record_id, QQ号, 游戏ID)，用于构建内存索引
+
+        Args:
+            synced_since (float, optional): 只返回该时间之后同步的记录
+
+        Returns:
+            list: (record_id, qq, game_id) 元组列表
+        """
+        def _query(conn, since):
+            if since is None:
+                return conn.execute("SELECT record_id, qq, game_id FROM records ORDER BY created_time").fetchall()
+            return conn.execute(
+                "SELECT record_id, qq, game_id FROM records WHERE synced_at >= ? ORDER BY created_time", (since,)
+            ).fetchall()
+        return await self._db.执行(_query, synced_since)
+
+    async def 记录数(self):
+        def _count(conn):
+            return conn.execute("SELECT COUNT(*) FROM records").fetchone()[0]
+        return await self._db.执行(_count)
+
+    async def 关闭(self):
+        await self._db.关闭()
+
+
+# 进程内共享的本地镜像
+镜像 = 本地镜像()
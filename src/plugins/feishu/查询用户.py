@@ -1,14 +1,36 @@
 from nonebot import logger, on_command, require
 from nonebot_plugin_apscheduler import scheduler
-from nonebot.adapters.onebot.v11 import MessageEvent
+from nonebot.adapters.onebot.v11 import Message, MessageEvent
+from nonebot.params import CommandArg
 from nonebot.permission import SUPERUSER
+import asyncio
 import nonebot
-import requests
 import json
-from .密钥管理 import FeishuTokenManager
+import time
+from datetime import date, datetime
+from .密钥管理 import token_manager
+from .客户端 import 请求, 飞书请求失败
+from .本地镜像 import 镜像
+from .用户索引 import 索引
+from .合并查询 import QQ合并查询
+from .记录 import 解析记录
+from ...utils.日志工具 import 调试, 摘要
+from ...utils.缓存工具 import 结果缓存
 
 require("nonebot_plugin_apscheduler")
-config = nonebot.get_driver().config
+driver = nonebot.get_driver()
+config = driver.config
+
+# 本地镜像配置
+MIRROR_ENABLED = getattr(config, "feishu_mirror_enabled", True)
+# 表中“修改时间”类型字段，配置后才启用增量同步；未配置时每次同步都是全量同步，同步间隔默认放长
+MODIFIED_FIELD = getattr(config, "feishu_modified_field", None)
+SYNC_MINUTES = int(getattr(config, "feishu_mirror_sync_minutes", 10 if MODIFIED_FIELD else 60))
+MIRROR_MAX_AGE = float(getattr(config, "feishu_mirror_max_age", 60 if MODIFIED_FIELD else SYNC_MINUTES * 60))  # 查询前允许的最大未同步秒数
+FULL_SYNC_HOURS = float(getattr(config, "feishu_mirror_full_sync_hours", 24))
+
+# 进程内共享的查询结果缓存，本地镜像写入新数据后失效
+查询缓存 = 结果缓存(ttl=float(getattr(config, "feishu_query_cache_ttl", 300)))
 
 
 class 查询用户:
@@ -20,102 +42,140 @@ class 查询用户:
         self.table_id = config.feishu_table_id
 
     async def ensure_token(self):
-        """确保token已初始化"""
-        if self.access_token is None or self.headers is None:
-            try:
-                # 获取access_token
-                token_manager = FeishuTokenManager()
-                self.access_token = token_manager.get_access_token()
-                logger.debug(f"Access Token: {self.access_token}")
-                self.headers = {"Authorization": f"Bearer {self.access_token}"}
-            except Exception as e:
-                logger.error(f"获取token失败: {e}")
-                raise
+        """确保token已初始化（token由进程内共享的管理器维护，有效时只是一次内存读取）"""
+        try:
+            self.access_token = await token_manager.get_access_token()
+            self.headers = {"Authorization": f"Bearer {self.access_token}"}
+        except Exception as e:
+            logger.error(f"获取token失败: {e}")
+            raise
     
-    async def 获取昨日提交用户(self):
-        """
-        获取所有符合条件的用户记录（支持分页查询，最多可获取5000条记录）
+    async def 迭代记录(self, request_data, max_pages=100):
         """
-        # 修改: 在实际需要时再初始化token
-        await self.ensure_token()
+        按页异步迭代多维表格的搜索结果
         
-        all_items = []
-        page_token = None
-        max_pages = 100  # 限制最大页数，防止无限循环
-        current_page = 0
+        每拿到一页立即交给调用方，调用方处理当前页时下一页已在请求中；
+        内存中只保留当前页的原始数据。限流等临时错误由客户端重试，
+        重试后仍失败的页会抛出异常，调用方不会在不知情时拿到不完整的数据。
         
-        while current_page < max_pages:
-            current_page += 1
-            logger.debug(f"正在获取第 {current_page} 页数据")
+        Args:
+            request_data (dict): records/search 的请求体
+            max_pages (int): 最大页数，防止无限循环
             
-            # 构建请求数据
-            request_data = {
-                "filter": {
-                    "conjunction": "and",
-                    "conditions": [
-                        {"field_name": "总分", "operator": "isGreater", "value": [74]},
-                        {
-                            "field_name": "提交时间",
-                            "operator": "is",
-                            "value": ["Yesterday"],
-                        },
-                    ],
-                },
-                "page_size": 500,  # 根据API文档，最大支持500条记录
-                "automatic_fields": "false",
-                "field_names": [
-                    "QQ号码",
-                    "总分",
-                    "游戏ID",
-                    "提交时间",
-                ],
-            }
-            
-            # 构建请求URL和参数
-            url = f"https://open.feishu.cn/open-apis/bitable/v1/apps/{self.base_id}/tables/{self.table_id}/records/search"
-            params = {}
-            
-            # 如果有page_token，添加到查询参数中
-            if page_token:
-                params["page_token"] = page_token
-                
-            data = json.dumps(request_data)
-            logger.debug(f"请求参数: {request_data}")
-            logger.debug(f"查询参数: {params}")
+        Yields:
+            list: 一页记录
             
-            try:
-                response = requests.post(
-                    url,
-                    headers=self.headers,
-                    data=data,
-                    params=params  # 将page_token作为查询参数传递
-                )
-                result = response.json()
-                logger.debug(f"第 {current_page} 页响应: {result}")
+        Raises:
+            飞书请求失败: 某页请求失败时抛出
+        """
+        await self.ensure_token()
+        
+        url = f"/bitable/v1/apps/{self.base_id}/tables/{self.table_id}/records/search"
+        data = json.dumps(request_data)
+        调试("请求参数: {}", 摘要(request_data))
+        
+        page_token = None
+        current_page = 1
+        next_request = asyncio.ensure_future(self._请求页(url, data, page_token))
+        total_count = 0
+        try:
+            while next_request is not None:
+                try:
+                    result = await next_request
+                except Exception as e:
+                    logger.error(f"获取第 {current_page} 页数据时发生异常: {e}")
+                    raise
+                next_request = None
                 
-                if result and result.get("code") == 0:
-                    items = result.get("data", {}).get("items", [])
-                    all_items.extend(items)
-                    logger.debug(f"第 {current_page} 页获取到 {len(items)} 条记录，当前总记录数: {len(all_items)}")
-                    
-                    # 检查是否还有更多数据
-                    has_more = result.get("data", {}).get("has_more", False)
-                    page_token = result.get("data", {}).get("page_token")
-                    logger.debug(f"has_more: {has_more}, page_token: {page_token}")
+                if not (result and result.get("code") == 0):
+                    logger.error(f"获取第 {current_page} 页数据失败: {result}")
+                    raise 飞书请求失败(f"获取第 {current_page} 页数据失败: {result and result.get('msg')}", result)
                     
-                    # 如果没有更多数据或page_token为空，则结束循环
-                    if not has_more or not page_token:
-                        logger.debug("没有更多页面，结束分页查询")
-                        break
+                page_data = result.get("data", {})
+                items = page_data.get("items") or []
+                has_more = page_data.get("has_more", False)
+                page_token = page_data.get("page_token")
+                
+                # 先发出下一页请求，再把当前页交给调用方
+                if has_more and page_token and current_page < max_pages:
+                    next_request = asyncio.ensure_future(self._请求页(url, data, page_token))
                 else:
-                    logger.error(f"获取第 {current_page} 页数据失败: {result}")
-                    break
+                    logger.debug("没有更多页面，结束分页查询")
                     
-            except Exception as e:
-                logger.error(f"获取第 {current_page} 页数据时发生异常: {e}", exc_info=True)
-                break
+                total_count += len(items)
+                调试("第 {} 页获取到 {} 条记录，当前总记录数: {}，has_more: {}", current_page, len(items), total_count, has_more)
+                current_page += 1
+                yield items
+        finally:
+            if next_request is not None and not next_request.done():
+                next_request.cancel()
                 
-        logger.info(f"总共获取到 {len(all_items)} 条用户记录")
+        logger.info(f"总共获取到 {total_count} 条用户记录")
+        
+    async def _请求页(self, url, data, page_token=None):
+        # 将page_token作为查询参数传递
+        params = {"page_token": page_token} if page_token else {}
+        return await 请求("POST", url, headers=self.headers, content=data, params=params)
+        
+    async def 逐页获取昨日提交用户(self):
+        """
+        按页异步迭代昨日提交且总分大于74的用户记录
+        
+        启用本地镜像时从本地SQLite读取，否则直接分页请求飞书
+        
+        Yields:
+            list: 一页申请记录
+        """
+        if MIRROR_ENABLED:
+            await 确保镜像新鲜()
+            items = await 镜像.查询昨日提交(min_score=74)
+            for start in range(0, len(items), 500):
+                yield items[start:start + 500]
+            return
+            
+        request_data = {
+            "filter": {
+                "conjunction": "and",
+                "conditions": [
+                    {"field_name": "总分", "operator": "isGreater", "value": [74]},
+                    {
+                        "field_name": "提交时间",
+                        "operator": "is",
+                        "value": ["Yesterday"],
+                    },
+                ],
+            },
+            "page_size": 500,  # 根据API文档，最大支持500条记录
+            "automatic_fields": "false",
+            "field_names": [
+                "QQ号码",
+                "总分",
+                "游戏ID",
+                "提交时间",
+            ],
+        }
+        async for items in self.迭代记录(request_data):
+            yield 解析记录(items)
+    
+    async def 获取昨日提交用户(self, use_cache=True):
+        """
+        获取所有符合条件的用户记录（支持分页查询，最多可获取50000条记录）
+        
+        结果按自然日缓存 feishu_query_cache_ttl 秒，并发调用共享同一次查询；
+        需要逐页处理时请使用 逐页获取昨日提交用户
+        
+        Args:
+            use_cache (bool): 是否使用缓存，为 False 时重新查询并更新缓存
+        """
+        key = ("昨日提交用户", date.today().isoformat())
+        if not use_cache:
+            查询缓存.失效(key)
+        return await 查询缓存.获取(key, self._查询昨日提交用户)
+        
+    async def _查询昨日提交用户(self):
+        all_items = []
+        async for items in self.逐页获取昨日提交用户():
+            all_items.extend(items)
         return {
             "code": 0,
             "data": {
@@ -123,40 +183,269 @@ class 查询用户:
             }
         }
 
+    async def 根据QQ号查询游戏ID(self, qq_number):
+        """
+        查询QQ号名下的全部游戏ID
+        
+        启用本地镜像时直接读取内存索引（O(1)，无网络请求）；
+        否则查询该QQ号的全部记录并提取游戏ID
+        
+        Returns:
+            list | None: 游戏ID列表，查询失败时返回 None
+        """
+        if MIRROR_ENABLED:
+            if not 索引.已加载:
+                await 确保镜像新鲜()
+                if not 索引.已加载:
+                    索引.重建(await 镜像.查询映射())
+            return 索引.游戏ID(str(qq_number))
+            
+        result = await self.根据QQ号查询用户(str(qq_number))
+        if not (result and result.get("code") == 0):
+            logger.warning(f"根据QQ号查询用户失败，结果: {result}")
+            return None
+        game_ids = []
+        for record in result.get("data", {}).get("items", []):
+            if record.game_id and record.game_id.lower() not in {known.lower() for known in game_ids}:
+                game_ids.append(record.game_id)
+        return game_ids
+
+    async def 根据游戏ID查询QQ号(self, game_ids):
+        """
+        查询使用各游戏ID的全部QQ号（游戏ID不区分大小写）
+        
+        启用本地镜像时读取内存索引；否则用一次飞书查询获取这些游戏ID的全部记录
+        
+        Args:
+            game_ids (list): 游戏ID列表
+            
+        Returns:
+            dict | None: {游戏ID: QQ号列表}，查询失败时返回 None
+        """
+        if MIRROR_ENABLED:
+            if not 索引.已加载:
+                索引.重建(await 镜像.查询映射())
+            return {game_id: 索引.QQ号(game_id) for game_id in game_ids}
+            
+        request_data = {
+            "filter": {
+                "conjunction": "or",
+                "conditions": [
+                    {"field_name": "游戏ID", "operator": "contains", "value": [game_id]}
+                    for game_id in game_ids
+                ],
+            },
+            "page_size": 500,
+            "automatic_fields": "false",
+            "field_names": ["QQ号码", "游戏ID"],
+        }
+        found = {game_id.lower(): [] for game_id in game_ids}
+        try:
+            async for items in self.迭代记录(request_data):
+                for record in 解析记录(items):
+                    owners = found.get(record.game_id.lower())
+                    if owners is not None and record.qq and record.qq not in owners:
+                        owners.append(record.qq)
+        except Exception as e:
+            logger.warning(f"根据游戏ID查询QQ号失败: {e}")
+            return None
+        return {game_id: found[game_id.lower()] for game_id in game_ids}
+
     async def 根据QQ号查询用户(self, qq_number: str):
         """
         根据QQ号查询特定用户记录
+        
+        启用本地镜像时从本地SQLite读取，否则请求飞书（合并窗口内的查询共用一次请求）
+        
+        Returns:
+            dict | None: {"code": 0, "data": {"items": 申请记录列表}}，查询失败时返回 None
         """
-        await self.ensure_token()
-        data = json.dumps(
-            {
-                "filter": {
-                    "conjunction": "and",
-                    "conditions": [
-                        {"field_name": "QQ号码", "operator": "is", "value": [qq_number]},
-                    ],
-                },
-                "page_size": 10,  # 一般一个QQ号只会有一条记录，设置10条以防万一
-                "automatic_fields": "false",
-                "field_names": [
-                    "QQ号码",
-                    "总分",
-                    "游戏ID",
-                    "提交时间",
+        if MIRROR_ENABLED:
+            await 确保镜像新鲜()
+            return {"code": 0, "data": {"items": await 镜像.根据QQ号查询(qq_number)}}
+            
+        # 短时间内的多个查询（如批量踢人触发的退群事件）合并为一次请求
+        items = await _QQ合并.查询(qq_number)
+        if items is None:
+            return None
+        return {"code": 0, "data": {"items": items}}
+
+
+async def _批量查询QQ(qq_numbers):
+    """
+    用 or 条件一次查询多个QQ号的记录
+
+    Args:
+        qq_numbers (list): QQ号列表，数量不超过飞书筛选条件上限
+
+    Returns:
+        dict: {QQ号: 申请记录列表}
+    """
+    request_data = {
+        "filter": {
+            "conjunction": "or",
+            "conditions": [
+                {"field_name": "QQ号码", "operator": "is", "value": [qq_number]}
+                for qq_number in qq_numbers
+            ],
+        },
+        "page_size": 500,
+        "automatic_fields": "false",
+        "field_names": [
+            "QQ号码",
+            "总分",
+            "游戏ID",
+            "提交时间",
+        ],
+    }
+    found = {qq_number: [] for qq_number in qq_numbers}
+    async for items in 查询用户().迭代记录(request_data):
+        for record in 解析记录(items):
+            if record.qq in found:
+                found[record.qq].append(record)
+    logger.debug(f"合并查询 {len(qq_numbers)} 个QQ号，命中 {sum(1 for items in found.values() if items)} 个")
+    return found
+
+
+_QQ合并 = QQ合并查询(_批量查询QQ)
+
+
+_同步锁 = None
+_上次同步 = 0
+_增量可用 = True  # 增量筛选因请求错误（如表中没有修改时间字段）失败后，本进程内改为全量同步
+
+
+async def 同步本地镜像(full=False):
+    """
+    将飞书申请表同步到本地镜像
+    
+    已有水位线且配置了修改时间字段时只拉取水位线之后修改过的记录；
+    首次同步或距上次全量同步超过 feishu_mirror_full_sync_hours 小时时全量同步，
+    并删除飞书中已不存在的记录。增量筛选出错（例如表中没有 feishu_modified_field
+    字段）时立即改为全量同步，本进程之后也不再尝试增量同步。并发调用只会执行一次同步。
+    
+    Args:
+        full (bool): 是否强制全量同步
+        
+    Returns:
+        int: 本次写入的记录数
+    """
+    global _同步锁, _上次同步, _增量可用
+    if _同步锁 is None:
+        _同步锁 = asyncio.Lock()
+    if _同步锁.locked():
+        # 已有同步在进行，等待其完成即可
+        async with _同步锁:
+            return 0
+            
+    async with _同步锁:
+        watermark = await 镜像.读取元数据("watermark")
+        last_full = await 镜像.读取元数据("last_full_sync", 0)
+        full = (
+            full
+            or watermark is None
+            or not MODIFIED_FIELD
+            or not _增量可用
+            or time.time() - last_full > FULL_SYNC_HOURS * 3600
+        )
+        
+        request_data = {
+            "page_size": 500,
+            "automatic_fields": True,
+            "field_names": ["QQ号码", "总分", "游戏ID", "提交时间"],
+        }
+        if not full:
+            # 日期筛选只精确到天，从水位线前一天开始拉取，重复的记录按record_id覆盖
+            since = watermark - 86_400_000
+            request_data["filter"] = {
+                "conjunction": "and",
+                "conditions": [
+                    {"field_name": MODIFIED_FIELD, "operator": "isGreater", "value": ["ExactDate", str(since)]},
                 ],
             }
-        )
+            
+        started = time.time()
         try:
-            response = requests.post(
-                f"https://open.feishu.cn/open-apis/bitable/v1/apps/{self.base_id}/tables/{self.table_id}/records/search",
-                headers=self.headers,
-                data=data,
+            count, new_watermark = await _拉取到镜像(request_data, watermark or 0)
+        except 飞书请求失败 as e:
+            if full or e.可重试:
+                raise
+            logger.warning(
+                f"增量同步失败，改为全量同步（请确认表中存在修改时间类型字段 {MODIFIED_FIELD}，"
+                f"或通过 feishu_modified_field 配置正确的字段名）: {e}"
             )
-            logger.debug(f"根据QQ号查询用户响应: {response.json()}")
-            return response.json()
-        except Exception as e:
-            logger.debug(f"根据QQ号查询用户失败: {e}", exc_info=True)
-            return None
+            _增量可用 = False
+            full = True
+            del request_data["filter"]
+            started = time.time()
+            count, new_watermark = await _拉取到镜像(request_data, watermark or 0)
+            
+        removed = 0
+        if full:
+            removed = await 镜像.删除未同步记录(started)
+            await 镜像.写入元数据("last_full_sync", started)
+            索引.重建(await 镜像.查询映射())
+            logger.info(f"本地镜像全量同步完成，写入 {count} 条记录，删除 {removed} 条已不存在的记录")
+        else:
+            if 索引.已加载:
+                索引.更新(await 镜像.查询映射(synced_since=started))
+            else:
+                索引.重建(await 镜像.查询映射())
+            logger.info(f"本地镜像增量同步完成，写入 {count} 条记录")
+        await 镜像.写入元数据("watermark", new_watermark)
+        # 增量同步有意重叠一天，几乎每次都会重写已有记录；只有水位线前进或删除了记录时数据才有变化
+        if new_watermark > (watermark or 0) or removed:
+            查询缓存.失效()
+        _上次同步 = time.monotonic()
+        return count
+
+
+async def _拉取到镜像(request_data, watermark):
+    count = 0
+    async for items in 查询用户().迭代记录(request_data, max_pages=10000):
+        watermark = max(watermark, await 镜像.写入记录(items))
+        count += len(items)
+    return count, watermark
+
+
+async def 确保镜像新鲜():
+    """
+    本地镜像超过 feishu_mirror_max_age 秒未同步时先同步一次
+    
+    同步失败（飞书缓慢或限流）时记录警告并继续使用本地数据，
+    在下一个同步周期之前不会再次尝试
+    """
+    global _上次同步
+    if _上次同步 and time.monotonic() - _上次同步 < MIRROR_MAX_AGE:
+        return
+    _上次同步 = time.monotonic()
+    try:
+        await 同步本地镜像()
+    except Exception as e:
+        logger.warning(f"同步本地镜像失败，使用本地已有数据: {e}")
+
+
+async def 定时同步本地镜像():
+    try:
+        await 同步本地镜像()
+    except Exception as e:
+        logger.error(f"定时同步本地镜像失败: {e}")
+
+
+# 只在启用镜像且配置了飞书表格时注册同步任务
+if MIRROR_ENABLED and getattr(config, "feishu_base_id", None) and getattr(config, "feishu_table_id", None):
+    scheduler.add_job(
+        定时同步本地镜像,
+        "interval",
+        minutes=SYNC_MINUTES,
+        id="feishu_mirror_sync",
+        next_run_time=datetime.now(),
+    )
+
+
+@driver.on_shutdown
+async def _关闭本地镜像():
+    await 镜像.关闭()
 
 
 weather = on_command("qc", aliases={"获取飞书记录"}, priority=5,permission=SUPERUSER)
@@ -164,10 +453,11 @@ weather = on_command("qc", aliases={"获取飞书记录"}, priority=5,permission
 
 @weather.handle()
 # @scheduler.scheduled_job("interval", seconds=30, id="xxx")
-async def _():
+async def _(arg: Message = CommandArg()):
     try:
         query = 查询用户()
-        result = await query.获取昨日提交用户()
+        # "/qc 刷新" 跳过缓存重新查询
+        result = await query.获取昨日提交用户(use_cache=arg.extract_plain_text().strip() != "刷新")
         if result and result.get("code") == 0:
             items = result.get("data", {}).get("items", [])
             if not items:
@@ -175,22 +465,16 @@ async def _():
             else:
                 
                 response_text = "📋 昨日提交白名单申请的用户如下：\n\n"
-                for idx, item in enumerate(items, start=1):
-                    fields = item.get("fields", {})
-                    qq = fields.get("QQ号码", [{}])[0].get("text", "未知")
-                    game_id = fields.get("游戏ID", [{}])[0].get(
-                        "text", "未知"
-                    )
-                    score = (
-                        fields.get("总分", {}).get("value", [0])[0]
-                        if isinstance(fields.get("总分"), dict)
-                        else "未知"
-                    )
+                for idx, record in enumerate(items, start=1):
+                    score = record.score if record.score is not None else "未知"
                     response_text += (
-                        f"{idx}. QQ：{qq} | 游戏ID：{game_id} | 总分：{score}\n"
+                        f"{idx}. QQ：{record.qq or '未知'} | 游戏ID：{record.game_id or '未知'} | 总分：{score}\n"
                     )
                 await weather.send(response_text)
         else:
             await weather.send("❌ 获取用户信息失败或无数据返回。")
+    except 飞书请求失败 as e:
+        logger.error(f"处理 /qc 命令时查询飞书失败：{e}")
+        await weather.send("❌ 查询飞书记录失败（接口限流或网络异常），请稍后重试。")
     except Exception as e:
         logger.error(f"处理 /qc 命令时发生异常：{e}", exc_info=True)
\ No newline at end of file
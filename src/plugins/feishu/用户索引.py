@@ -0,0 +1,92 @@
+"""
+QQ号与游戏ID的内存索引模块
+由申请记录构建 QQ → 全部游戏ID 与 游戏ID → 全部QQ 的双向映射，退群等事件无需网络请求即可查询
+"""
+
+
+class 用户索引:
+    """
+    QQ号 ↔ 游戏ID 双向索引
+
+    以 record_id 为单位维护，同一条记录修改了QQ号或游戏ID时会替换旧的映射。
+    游戏ID按小写建立反向索引（Minecraft玩家名不区分大小写），返回时保留原始大小写。
+    """
+
+    def __init__(self):
+        self.已加载 = False
+        self._记录 = {}  # {record_id: (qq, game_id)}
+        self._按QQ = {}  # {qq: {record_id: game_id}}
+        self._按游戏ID = {}  # {game_id.lower(): {record_id: qq}}
+
+    def 重建(self, rows):
+        """
+        用全部记录重建索引
+
+        Args:
+            rows (iterable): (record_id, qq, game_id) 元组
+        """
+        self._记录 = {}
+        self._按QQ = {}
+        self._按游戏ID = {}
+        self.更新(rows)
+        self.已加载 = True
+
+    def 更新(self, rows):
+        """
+        插入或更新若干条记录的映射
+
+        Args:
+            rows (iterable): (record_id, qq, game_id) 元组
+        """
+        for record_id, qq, game_id in rows:
+            self._移除(record_id)
+            if not qq or not game_id:
+                continue
+            self._记录[record_id] = (qq, game_id)
+            self._按QQ.setdefault(qq, {})[record_id] = game_id
+            self._按游戏ID.setdefault(game_id.lower(), {})[record_id] = qq
+
+    def _移除(self, record_id):
+        old = self._记录.pop(record_id, None)
+        if old is None:
+            return
+        qq, game_id = old
+        by_qq = self._按QQ.get(qq)
+        if by_qq is not None:
+            by_qq.pop(record_id, None)
+            if not by_qq:
+                del self._按QQ[qq]
+        by_game_id = self._按游戏ID.get(game_id.lower())
+        if by_game_id is not None:
+            by_game_id.pop(record_id, None)
+            if not by_game_id:
+                del self._按游戏ID[game_id.lower()]
+
+    def 游戏ID(self, qq):
+        """
+        获取QQ号名下的全部游戏ID（去重，保持记录顺序）
+
+        Returns:
+            list: 游戏ID列表
+        """
+        by_qq = self._按QQ.get(str(qq))
+        if not by_qq:
+            return []
+        return list({game_id.lower(): game_id for game_id in by_qq.values()}.values())
+
+    def QQ号(self, game_id):
+        """
+        获取使用该游戏ID的全部QQ号
+
+        Returns:
+            list: QQ号列表
+        """
+        by_game_id = self._按游戏ID.get(game_id.lower())
+        return list(dict.fromkeys(by_game_id.values())) if by_game_id else []
+
+    def __len__(self):
+        return len(self._记录)
+
+
+# 进程内共享的索引
+索引 = 用户索引()
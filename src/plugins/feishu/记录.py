@@ -0,0 +1,107 @@
+"""
+申请记录模型模块
+飞书多维表格返回的每一行在这里解析一次，之后各处只读取属性，不再保留原始的嵌套结构
+"""
+
+
+def _文本(value):
+    """提取文本/人员/公式等字段中的文本值"""
+    if isinstance(value, list):
+        return "".join(_文本(part) for part in value)
+    if isinstance(value, dict):
+        if "text" in value:
+            return str(value["text"])
+        if "value" in value:
+            return _文本(value["value"])
+        return ""
+    return "" if value is None else str(value)
+
+
+def _数值(value):
+    if isinstance(value, dict):
+        value = value.get("value")
+    if isinstance(value, list):
+        value = value[0] if value else None
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _时间戳(value):
+    if isinstance(value, dict):
+        value = value.get("value")
+    if isinstance(value, list):
+        value = value[0] if value else None
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+class 申请记录:
+    """
+    白名单申请表中的一条记录
+
+    Attributes:
+        record_id (str): 飞书记录ID
+        qq (str): QQ号码（已去除首尾空白）
+        game_id (str): 游戏ID（已去除首尾空白）
+        score (int | float | None): 总分，整数分值以 int 保存
+        submitted_at (int | None): 提交时间（毫秒时间戳）
+        created_time (int): 记录创建时间（毫秒时间戳），去重时用于判断新旧
+    """
+
+    __slots__ = ("record_id", "qq", "game_id", "score", "submitted_at", "created_time")
+
+    def __init__(self, record_id, qq, game_id, score=None, submitted_at=None, created_time=0):
+        self.record_id = record_id
+        self.qq = qq
+        self.game_id = game_id
+        if score is not None and score == int(score):
+            score = int(score)
+        self.score = score
+        self.submitted_at = submitted_at
+        self.created_time = created_time or 0
+
+    @classmethod
+    def 从飞书记录(cls, item):
+        """
+        解析飞书 records/search 返回的一条记录
+
+        Args:
+            item (dict): 飞书记录
+
+        Returns:
+            申请记录: 解析后的记录
+        """
+        fields = item.get("fields") or {}
+        return cls(
+            item.get("record_id"),
+            _文本(fields.get("QQ号码")).strip(),
+            _文本(fields.get("游戏ID")).strip(),
+            _数值(fields.get("总分")),
+            _时间戳(fields.get("提交时间")),
+            item.get("created_time") or 0,
+        )
+
+    @property
+    def 有效(self):
+        """QQ号和游戏ID都不为空"""
+        return bool(self.qq and self.game_id)
+
+    def __repr__(self):
+        return f"申请记录(qq={self.qq}, game_id={self.game_id}, score={self.score})"
+
+
+def 解析记录(items):
+    """
+    批量解析飞书记录
+
+    Args:
+        items (list): 飞书 records/search 返回的记录列表
+
+    Returns:
+        list: 申请记录列表
+    """
+    return [申请记录.从飞书记录(item) for item in items]
@@ -1,3 +1,4 @@
 from . import command
+from . import 调度
 
-__all__ = ["command"]
\ No newline at end of file
+__all__ = ["command", "调度"]
\ No newline at end of file
@@ -1,35 +1,414 @@
-import time
+import asyncio
 import re
-import requests
+import httpx
 import nonebot
 from nonebot import logger, on_command
-from datetime import datetime, timedelta
 from nonebot.adapters.onebot.v11 import Message, MessageSegment
 from nonebot.params import CommandArg, ArgPlainText
 from nonebot.matcher import Matcher
 from nonebot.permission import SUPERUSER
+from .客户端 import 获取客户端, 获取并发限制
+from .日志引擎 import 命令结果, 获取游标
+from .终端订阅 import 获取订阅
+from ...utils.日志工具 import 调试, 摘要
+from .白名单镜像 import 获取白名单镜像, 解析白名单列表, 是白名单列表
+from .实例注册表 import 实例注册表
 
 config = nonebot.get_driver().config
 
+# 等待命令结果的最长秒数，以及轮询日志的退避间隔
+_命令超时 = float(getattr(config, "mcsm_command_timeout", 5))
+_初始轮询间隔 = 0.1
+_最大轮询间隔 = 1.0
+
+
+# 白名单命令的结果状态
+结果_已添加 = "已添加"
+结果_已存在 = "已存在"
+结果_已删除 = "已删除"
+结果_不存在 = "不存在"
+结果_错误 = "错误"
+结果_未确认 = "未确认"
+
+_已存在模式 = re.compile(r"already|已存在|已经在|已在", re.IGNORECASE)
+_不存在模式 = re.compile(r"not (?:in|on|found|whitelisted)|isn't|不在|不存在|找不到", re.IGNORECASE)
+_错误模式 = re.compile(r"error|exception|fail|invalid|unknown|错误|异常|失败|无效|未知", re.IGNORECASE)
+# 只有明确的成功输出才算成功，例如 Added Steve to the whitelist / 已将 Steve 添加到白名单
+_已添加模式 = re.compile(r"\badded\b|已添加|添加到|加入", re.IGNORECASE)
+_已删除模式 = re.compile(r"\bremoved\b|已删除|已移除|删除了|移除了|移出", re.IGNORECASE)
+# 控制台回显的命令本身（包括原版报错时带 <--[HERE] 的回显），不是命令结果
+_回显模式 = re.compile(r"whitelist\s+(?:add|remove)\s", re.IGNORECASE)
+
+
+_白名单命令模式 = re.compile(r"^\s*(?:multilogin\s+)?whitelist\s+(add|remove)\s+(\S+)\s*$", re.IGNORECASE)
+
+
+_实例锁 = {}
+
+
+def 获取实例锁(uuid, daemonid):
+    """
+    获取实例的命令锁
+    
+    同一实例同一时间只允许一组“发送命令 → 等待结果”在执行，
+    等待中的调用按先后顺序排队，保证日志时间窗口不会混入其他命令的输出。
+    """
+    key = (uuid, daemonid)
+    lock = _实例锁.get(key)
+    if lock is None:
+        lock = _实例锁[key] = asyncio.Lock()
+    return lock
+
+
+def _游戏ID模式(game_ids):
+    # 游戏ID不区分大小写，按完整单词匹配，避免 abc 误匹配 abcd
+    id_map = {game_id.lower(): game_id for game_id in game_ids}
+    id_pattern = re.compile(
+        r"(?<![0-9A-Za-z_])(" + "|".join(re.escape(game_id) for game_id in id_map) + r")(?![0-9A-Za-z_])",
+        re.IGNORECASE,
+    )
+    return id_map, id_pattern
+
+
+def 推断完成条件(commands):
+    """
+    根据命令推断“结果已输出”的判断条件
+    
+    白名单增删命令以每个游戏ID都已得到结果（不再是 结果_未确认）作为完成标志；
+    其他命令返回 None，由调用方按输出是否稳定来判断。
+    
+    Args:
+        commands (list): 命令列表
+        
+    Returns:
+        callable | None: 接收日志行列表、返回是否已完成的函数
+    """
+    game_ids = []
+    actions = set()
+    for command in commands:
+        matched = _白名单命令模式.match(command)
+        if not matched:
+            return None
+        actions.add(matched.group(1).lower())
+        game_ids.append(matched.group(2))
+    if not game_ids or len(actions) > 1:
+        return None
+    action = actions.pop()
+    
+    def 已完成(lines):
+        results = 归类白名单日志(game_ids, [line.内容 for line in lines], action)
+        return all(result["状态"] != 结果_未确认 for result in results.values())
+    return 已完成
+
+
+def 归类白名单日志(game_ids, lines, action="add"):
+    """
+    将批量白名单命令的输出日志按游戏ID归类，并判断每个ID的执行结果
+    
+    提到游戏ID的行归入该ID；紧邻命令回显、本身不含游戏ID的错误行（如原版的
+    Unknown or incomplete command）也归入回显中的ID。只有出现明确的成功输出时
+    才判定为已添加/已删除，否则保持 结果_未确认。
+    
+    Args:
+        game_ids (list): 本批次的游戏ID列表
+        lines (list): 覆盖整批命令的日志行
+        action (str): 白名单动作，add 或 remove
+        
+    Returns:
+        dict: {game_id: {"状态": 结果状态, "日志": [日志行]}}
+    """
+    results = {game_id: {"状态": 结果_未确认, "日志": []} for game_id in game_ids}
+    if not game_ids:
+        return results
+        
+    id_map, id_pattern = _游戏ID模式(game_ids)
+    matched_ids = [{m.lower() for m in id_pattern.findall(line)} for line in lines]
+    for index, line in enumerate(lines):
+        for matched in matched_ids[index]:
+            result = results[id_map[matched]]
+            if _回显模式.search(line):
+                # 回显前后不含游戏ID的错误行属于这条命令
+                for neighbor in (index - 1, index + 1):
+                    if 0 <= neighbor < len(lines) and not matched_ids[neighbor] and _错误模式.search(lines[neighbor]):
+                        result["日志"].append(lines[neighbor])
+            result["日志"].append(line)
+            
+    success_pattern = _已添加模式 if action == "add" else _已删除模式
+    for game_id, result in results.items():
+        text = "\n".join(result["日志"])
+        if not text:
+            continue
+        # 成功判断不看回显行，回显中的命令文本不能当作结果
+        output = "\n".join(line for line in result["日志"] if not _回显模式.search(line))
+        if _错误模式.search(text) and not (_已存在模式.search(text) or _不存在模式.search(text)):
+            result["状态"] = 结果_错误
+        elif _已存在模式.search(text):
+            result["状态"] = 结果_已存在
+        elif _不存在模式.search(text):
+            result["状态"] = 结果_不存在
+        elif success_pattern.search(output):
+            result["状态"] = 结果_已添加 if action == "add" else 结果_已删除
+    return results
+
 
 class 面板管理:
     def __init__(self, command=None, uuid=None, daemonid=None):
         self.api_key = config.mcsm_api_key
         self.api_url = config.mcsm_api_url
-        self.uuid = uuid or config.mcsm_uuid
-        self.daemonid = daemonid or config.mcsm_daemonid
+        # 通过实例注册表指定目标实例时，不要求配置默认实例
+        self.uuid = uuid or getattr(config, "mcsm_uuid", None)
+        self.daemonid = daemonid or getattr(config, "mcsm_daemonid", None)
         self.command = command
-        self.headers = {
-            "Content-Type": "application/json; charset=utf-8",
-            "X-Requested-With": "XMLHttpRequest"
-        }
         logger.debug(f"面板管理实例已创建，API URL: {self.api_url}, UUID: {self.uuid}, DaemonID: {self.daemonid}")
         
-    def 获取实例列表(self):
-        # TODO: 实现实例列表获取功能
-        pass
+    async def 获取实例列表(self, daemonid=None):
+        """
+        从面板获取实例列表（分页拉取全部实例）
+        
+        Args:
+            daemonid (str, optional): 只获取该守护进程下的实例，默认获取全部守护进程
+            
+        Returns:
+            list: [{"uuid", "daemonid", "name", "status", "players"}]
+        """
+        daemon_ids = [daemonid] if daemonid else await self._获取守护进程列表()
+        instances = []
+        try:
+            for daemon_id in daemon_ids:
+                page = 1
+                while True:
+                    params = {
+                        "apikey": self.api_key,
+                        "daemonId": daemon_id,
+                        "page": page,
+                        "page_size": 50,
+                        "instance_name": "",
+                        "status": "",
+                    }
+                    response = await 获取客户端().get("/api/service/remote_service_instances", params=params)
+                    if response.status_code != 200:
+                        logger.error(f"获取实例列表失败: HTTP {response.status_code}, 响应内容: {response.text}")
+                        raise Exception(f"获取实例列表失败: HTTP {response.status_code}")
+                        
+                    data = response.json().get("data", {})
+                    for item in data.get("data", []):
+                        info = item.get("info") or {}
+                        try:
+                            players = int(info.get("currentPlayers", -1))
+                        except (TypeError, ValueError):
+                            players = -1
+                        instances.append({
+                            "uuid": item.get("instanceUuid"),
+                            "daemonid": daemon_id,
+                            "name": (item.get("config") or {}).get("nickname") or item.get("instanceUuid"),
+                            "status": item.get("status"),
+                            "players": players,
+                        })
+                    if page >= int(data.get("maxPage", 1) or 1):
+                        break
+                    page += 1
+        except httpx.HTTPError as e:
+            logger.error(f"获取实例列表时网络请求异常: {str(e)}", exc_info=True)
+            raise Exception(f"网络请求异常: {str(e)}")
+            
+        logger.info(f"获取到 {len(instances)} 个实例")
+        return instances
+        
+    async def _获取守护进程列表(self):
+        try:
+            response = await 获取客户端().get("/api/service/remote_services_list", params={"apikey": self.api_key})
+            if response.status_code == 200:
+                daemon_ids = [item["uuid"] for item in response.json().get("data", []) if item.get("uuid")]
+                if daemon_ids:
+                    return daemon_ids
+            logger.warning(f"获取守护进程列表失败: HTTP {response.status_code}，使用配置的守护进程ID")
+        except httpx.HTTPError as e:
+            logger.warning(f"获取守护进程列表时网络请求异常: {str(e)}，使用配置的守护进程ID")
+        return [self.daemonid] if self.daemonid else []
+        
+    async def 发送命令(self, command, uuid=None, daemonid=None, timeout=None):
+        return await self._提交并设置窗口([command], uuid, daemonid, timeout)
+        
+    async def 批量发送命令(self, commands, uuid=None, daemonid=None, timeout=None, 保持顺序=True):
+        """
+        连续发送多条命令，并只等待一次覆盖整批命令的日志
+        
+        Args:
+            commands (list): 命令列表
+            uuid (str, optional): 实例UUID，默认使用配置
+            daemonid (str, optional): 守护进程ID，默认使用配置
+            timeout (float, optional): 等待结果的最长秒数，默认使用配置
+            保持顺序 (bool): 为 False 时按 mcsm_max_concurrency 并发提交，
+                命令到达服务器的顺序不再确定，只适用于互不依赖的命令
+            
+        Returns:
+            命令结果: 整批命令时间范围内的日志行
+        """
+        if not commands:
+            return 命令结果(commands, None, None, [])
+            
+        logger.info(f"开始批量发送 {len(commands)} 条命令")
+        async with 获取实例锁(uuid or self.uuid, daemonid or self.daemonid):
+            await self._提交并设置窗口(commands, uuid, daemonid, timeout, 保持顺序)
+            
+            # 每条命令按约200字节输出估算日志窗口
+            获取游标(uuid or self.uuid, daemonid or self.daemonid).预留窗口((len(commands) * 200 + 1023) // 1024)
+            return await self.等待结果(commands, uuid, daemonid, timeout=timeout)
+        
+    async def _提交并设置窗口(self, commands, uuid, daemonid, timeout, 保持顺序=True):
+        timeout = _命令超时 if timeout is None else timeout
+        if 保持顺序 or len(commands) == 1:
+            submitted = [await self._提交命令(command, uuid, daemonid) for command in commands]
+        else:
+            submitted = await asyncio.gather(*(self._限流提交(command, uuid, daemonid) for command in commands))
+        command_data = submitted[-1]
+        command_times = [data["time"] for data in submitted]  # 命令发送时间戳
+        first_time = min(command_times)
+        last_time = max(command_times)
+            
+        self.start_time = first_time - 1000  # 提前1秒
+        # 日志时间只精确到秒：不早于命令发送所在秒的行才可能是命令输出
+        self.command_time = first_time - first_time % 1000
+        # 日志时间只精确到秒，截止时间额外放宽1秒
+        self.end_time = last_time + int(timeout * 1000) + 1000
+        logger.debug(f"设置日志时间范围: 开始时间 {self.start_time}, 结束时间 {self.end_time}")
+        return command_data
+        
+    async def _限流提交(self, command, uuid, daemonid):
+        async with 获取并发限制():
+            return await self._提交命令(command, uuid, daemonid)
         
-    def 发送命令(self, command, uuid=None, daemonid=None):
+    async def 等待结果(self, commands, uuid=None, daemonid=None, 完成条件=None, timeout=None):
+        """
+        按退避间隔轮询日志，命令结果一出现就返回，最迟在截止时间返回
+        
+        Args:
+            commands (str | list): 已发送的命令
+            完成条件 (callable, optional): 接收日志行列表、返回是否已完成的函数，
+                默认根据命令推断；无法推断时以输出稳定为准：已出现命令发送后的行，
+                且一次轮询内没有新增
+            timeout (float, optional): 最长等待秒数，默认使用配置 mcsm_command_timeout
+            
+        Returns:
+            命令结果: 时间范围内的日志行
+        """
+        command_list = [commands] if isinstance(commands, str) else list(commands)
+        完成条件 = 完成条件 or 推断完成条件(command_list)
+        timeout = _命令超时 if timeout is None else timeout
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+        delay = _初始轮询间隔
+        last_count = 0
+        
+        cursor = 获取游标(uuid or self.uuid, daemonid or self.daemonid)
+        subscription = 获取订阅(uuid or self.uuid, daemonid or self.daemonid)
+        
+        while True:
+            wait = min(delay, max(0.0, deadline - loop.time()))
+            if subscription is not None and subscription.已连接:
+                # 终端流推送新行时立即唤醒
+                await cursor.等待新行(wait)
+            else:
+                await asyncio.sleep(wait)
+            result = await self.查询日志(uuid, daemonid, commands)
+            if 完成条件 is not None:
+                if 完成条件(result.行):
+                    break
+            else:
+                # 时间范围提前了1秒，其中早于命令的行不算命令输出
+                count = sum(1 for line in result.行 if line.时间戳 >= self.command_time)
+                if count and count == last_count:
+                    break
+                last_count = count
+            if loop.time() >= deadline:
+                logger.warning(f"等待命令结果超时（{timeout}秒），返回已获取的 {len(result)} 行日志")
+                break
+            delay = min(delay * 2, _最大轮询间隔)
+            
+        return result
+        
+    async def 批量添加白名单(self, game_ids, uuid=None, daemonid=None):
+        """
+        批量添加白名单，一次日志查询得到每个游戏ID的结果
+        
+        Args:
+            game_ids (list): 游戏ID列表
+            
+        Returns:
+            dict: {game_id: {"状态": 结果状态, "日志": [日志行]}}
+        """
+        return await self._批量执行白名单("add", game_ids, uuid, daemonid)
+        
+    async def 批量删除白名单(self, game_ids, uuid=None, daemonid=None):
+        """
+        批量删除白名单，一次日志查询得到每个游戏ID的结果
+        
+        Args:
+            game_ids (list): 游戏ID列表
+            
+        Returns:
+            dict: {game_id: {"状态": 结果状态, "日志": [日志行]}}
+        """
+        return await self._批量执行白名单("remove", game_ids, uuid, daemonid)
+        
+    async def _批量执行白名单(self, action, game_ids, uuid=None, daemonid=None):
+        game_ids = list(dict.fromkeys(game_ids))
+        if not game_ids:
+            return {}
+            
+        # 白名单镜像已加载时，跳过已在白名单中的游戏ID的添加命令；
+        # 删除命令总是发送，镜像过时也不会漏删
+        mirror = 获取白名单镜像(uuid or self.uuid, daemonid or self.daemonid)
+        results = {}
+        to_send = []
+        for game_id in game_ids:
+            if action == "add" and mirror.已加载 and game_id in mirror:
+                results[game_id] = {"状态": 结果_已存在, "日志": []}
+            else:
+                to_send.append(game_id)
+        if len(to_send) < len(game_ids):
+            logger.info(f"白名单镜像命中 {len(game_ids) - len(to_send)} 个游戏ID，跳过对应的 {action} 命令")
+            
+        if to_send:
+            commands = [f"multilogin whitelist {action} {game_id}" for game_id in to_send]
+            # 各游戏ID的白名单命令互不依赖，可以并发提交
+            result = await self.批量发送命令(commands, uuid, daemonid, 保持顺序=False)
+            sent_results = 归类白名单日志(to_send, [line.内容 for line in result.行], action)
+            for game_id, sent_result in sent_results.items():
+                if sent_result["状态"] in (结果_已添加, 结果_已存在):
+                    mirror.添加(game_id)
+                elif sent_result["状态"] in (结果_已删除, 结果_不存在):
+                    mirror.删除(game_id)
+            results.update(sent_results)
+        return {game_id: results[game_id] for game_id in game_ids}
+        
+    async def 刷新白名单镜像(self, uuid=None, daemonid=None):
+        """
+        发送白名单列表命令，用输出结果重新载入实例的白名单镜像
+        
+        列表命令由配置 mcsm_whitelist_list_command 指定，必须列出增删命令所操作的
+        multilogin 白名单（原版 whitelist list 是另一份名单）；未配置时镜像保持未加载。
+        
+        Returns:
+            白名单镜像: 刷新后的镜像；未配置列表命令或未能解析列表输出时保持原状
+        """
+        mirror = 获取白名单镜像(uuid or self.uuid, daemonid or self.daemonid)
+        list_command = getattr(config, "mcsm_whitelist_list_command", None)
+        if not list_command:
+            logger.debug("未配置 mcsm_whitelist_list_command，不载入白名单镜像")
+            return mirror
+        async with 获取实例锁(uuid or self.uuid, daemonid or self.daemonid):
+            await self.发送命令(list_command, uuid, daemonid)
+            result = await self.等待结果(list_command, uuid, daemonid, 完成条件=是白名单列表)
+        game_ids = 解析白名单列表([line.内容 for line in result.行])
+        if game_ids is None:
+            logger.warning("未能从日志中解析白名单列表，白名单镜像保持不变")
+        else:
+            mirror.载入(game_ids)
+            logger.info(f"白名单镜像已刷新，共 {len(mirror)} 个游戏ID")
+        return mirror
+        
+    async def _提交命令(self, command, uuid=None, daemonid=None):
         uuid = uuid or self.uuid
         daemonid = daemonid or self.daemonid
         
@@ -39,11 +418,11 @@ class 面板管理:
             logger.error("缺少必要的参数: uuid, daemonid 或 command")
             raise ValueError("缺少必要的参数: uuid, daemonid 或 command")
             
-        url = f"{self.api_url}/api/protected_instance/command?apikey={self.api_key}&uuid={uuid}&daemonId={daemonid}&command={command}"
-        logger.info(f"正在发送命令到URL: {url}")
+        params = {"apikey": self.api_key, "uuid": uuid, "daemonId": daemonid, "command": command}
+        logger.info(f"正在发送命令: {command}")
         
         try:
-            response = requests.post(url, headers=self.headers)
+            response = await 获取客户端().post("/api/protected_instance/command", params=params)
             logger.debug(f"命令发送响应状态码: {response.status_code}")
             
             if response.status_code != 200:
@@ -51,89 +430,59 @@ class 面板管理:
                 raise Exception(f"命令发送失败: HTTP {response.status_code}")
             
             command_data = response.json()
-            logger.debug(f"命令发送成功，响应数据: {command_data}")
-            command_time = command_data["time"]  # 命令发送时间戳
-            
-            logger.info(f"命令发送成功，时间戳: {command_time}")
-            
-            time.sleep(1.5)
-            self.start_time = command_time - 1000  # 提前1秒
-            self.end_time = command_time + 5000    # 延后5秒
-            
-            logger.debug(f"设置日志时间范围: 开始时间 {self.start_time}, 结束时间 {self.end_time}")
+            调试("命令发送成功，响应数据: {}", 摘要(command_data))
+            logger.info(f"命令发送成功，时间戳: {command_data['time']}")
             return command_data
-        except requests.RequestException as e:
+        except httpx.HTTPError as e:
             logger.error(f"发送命令时网络请求异常: {str(e)}", exc_info=True)
             raise Exception(f"网络请求异常: {str(e)}")
         except Exception as e:
             logger.error(f"发送命令时发生未知错误: {str(e)}", exc_info=True)
             raise
         
-    def 查询日志(self, uuid=None, daemonid=None):
+    async def 查询日志(self, uuid=None, daemonid=None, command=None):
+        """
+        增量查询实例日志，返回本次命令时间范围内的结构化结果
+        
+        Returns:
+            命令结果: 时间范围内的日志行
+        """
         uuid = uuid or self.uuid
         daemonid = daemonid or self.daemonid
+        cursor = 获取游标(uuid, daemonid)
         
-        logger.debug(f"准备查询日志，UUID: {uuid}, DaemonID: {daemonid}")
-        
-        logs_url = f"{self.api_url}/api/protected_instance/outputlog?apikey={self.api_key}&uuid={uuid}&daemonId={daemonid}&size=1kb"
-        logger.info(f"正在获取日志，URL: {logs_url}")
+        # 已订阅终端流时，输出已在内存缓存中，无需下载日志
+        subscription = 获取订阅(uuid, daemonid)
+        if subscription is not None and subscription.已连接:
+            return 命令结果(command, self.start_time, self.end_time, cursor.提取(self.start_time, self.end_time))
         
         try:
-            response = requests.get(logs_url, headers=self.headers)
-            logger.debug(f"日志查询响应状态码: {response.status_code}")
-            
-            if response.status_code != 200:
-                logger.error(f"日志查询失败: HTTP {response.status_code}, 响应内容: {response.text}")
-                raise Exception(f"日志查询失败: HTTP {response.status_code}")
-            
-            logs_data = response.json()
-            log_content = logs_data["data"]
-            log_time = logs_data["time"]
-            
-            logger.debug(f"日志查询成功，日志时间: {log_time}, 日志长度: {len(log_content)}")
-            logger.debug(f"日志内容: {log_content}")
-            
-            # 5. 提取匹配时间范围内的日志
-            matched_logs = []
-            current_timestamp = None
-            
-            logger.debug(f"开始提取时间范围内的日志，范围: {self.start_time} - {self.end_time}")
-            
-            for line_num, line in enumerate(log_content.split('\n')):
-                # 尝试提取时间戳
-                time_match = re.search(r'(\d{2}:\d{2}:\d{2})', line)
-                if time_match:
-                    time_str = time_match.group(1)
-                    # 将日志时间转换为绝对时间戳
-                    log_datetime = datetime.fromtimestamp(log_time / 1000)
-                    line_time = datetime.strptime(time_str, "%H:%M:%S")
-                    line_time = line_time.replace(
-                        year=log_datetime.year,
-                        month=log_datetime.month,
-                        day=log_datetime.day
-                    )
-                    current_timestamp = int(line_time.timestamp() * 1000)
-                    logger.debug(f"解析日志行 #{line_num} 时间戳: {current_timestamp}")
-                else:
-                    logger.debug(f"日志行 #{line_num} 未找到时间戳: {line[:50]}...")
+            while True:
+                params = {"apikey": self.api_key, "uuid": uuid, "daemonId": daemonid, "size": cursor.窗口大小}
+                response = await 获取客户端().get("/api/protected_instance/outputlog", params=params)
+                调试("日志查询 UUID: {}，响应状态码: {}，窗口: {}", uuid, response.status_code, cursor.窗口大小, every=50)
+                
+                if response.status_code != 200:
+                    logger.error(f"日志查询失败: HTTP {response.status_code}, 响应内容: {response.text}")
+                    raise Exception(f"日志查询失败: HTTP {response.status_code}")
                 
-                # 检查是否在时间范围内
-                if current_timestamp and self.start_time <= current_timestamp <= self.end_time:
-                    matched_logs.append(line)
-                    logger.debug(f"匹配日志行 #{line_num}: {line[:50]}...")
-                else:
-                    logger.debug(f"日志行 #{line_num} 不在时间范围内: {line[:50]}...")
-            
-            logger.info(f"日志提取完成，共匹配到 {len(matched_logs)} 行日志")
-            return '\n'.join(matched_logs)
-        except requests.RequestException as e:
+                logs_data = response.json()
+                if cursor.解析(logs_data["data"], logs_data["time"]):
+                    break
+                logger.debug(f"两次查询之间的日志超出窗口，扩大到 {cursor.窗口大小} 后重新查询")
+            
+            result = 命令结果(command, self.start_time, self.end_time, cursor.提取(self.start_time, self.end_time))
+            # 等待结果时每次轮询都会查询日志，采样输出
+            调试("日志提取完成，共匹配到 {} 行日志", len(result), every=50)
+            return result
+        except httpx.HTTPError as e:
             logger.error(f"查询日志时网络请求异常: {str(e)}", exc_info=True)
             raise Exception(f"网络请求异常: {str(e)}")
         except Exception as e:
             logger.error(f"查询日志时发生未知错误: {str(e)}", exc_info=True)
             raise
         
-    def 发送并获取日志(self, command=None, uuid=None, daemonid=None):
+    async def 发送并获取日志(self, command=None, uuid=None, daemonid=None, timeout=None):
         command = command or self.command
         logger.debug(f"开始执行发送并获取日志操作，命令: {command}")
         
@@ -141,11 +490,34 @@ class 面板管理:
             logger.error("命令不能为空")
             raise ValueError("命令不能为空")
             
-        self.发送命令(command, uuid, daemonid)
-        return self.查询日志(uuid, daemonid)
+        async with 获取实例锁(uuid or self.uuid, daemonid or self.daemonid):
+            await self.发送命令(command, uuid, daemonid, timeout)
+            return await self.等待结果(command, uuid, daemonid, timeout=timeout)
+
+
+# 进程内共享的实例注册表
+注册表 = 实例注册表(lambda: 面板管理().获取实例列表())
 
 
 command = on_command("mcsm", aliases={"MCSM"}, priority=5,permission=SUPERUSER)
+instance_list = on_command("mcsm实例", aliases={"MCSM实例", "mcsm_instances"}, priority=4, permission=SUPERUSER)
+
+
+@instance_list.handle()
+async def _():
+    try:
+        instances = await 注册表.全部实例()
+    except Exception as e:
+        logger.error(f"获取实例列表失败: {str(e)}")
+        await instance_list.finish("获取实例列表失败，请查看日志")
+    if not instances:
+        await instance_list.finish("面板中没有任何实例")
+    lines = [
+        f"{instance.name} | {instance.状态} | 在线: {instance.players if instance.players >= 0 else '-'} | {instance.uuid}"
+        for instance in instances
+    ]
+    await instance_list.finish("MCSM实例列表：\n" + "\n".join(lines))
+
 
 @command.handle()
 async def _(args: Message = CommandArg()):
@@ -155,21 +527,38 @@ async def _(args: Message = CommandArg()):
     
     logger.debug(f"配置信息 - UUID: {uuid}, DaemonID: {daemonid}")
     
-    if not uuid or not daemonid:
-        logger.error("未配置MCSM信息，请检查配置文件")
-        await command.finish("未配置 MCSM 信息，请检查配置文件")
-        
     args_text = args.extract_plain_text().strip()
     logger.info(f"接收到命令参数: {args_text}")
     
+    # 使用 @实例名 指定目标实例时不需要配置默认实例；交互输入的命令发往默认实例
+    if not args_text.startswith("@") and (not uuid or not daemonid):
+        logger.error("未配置MCSM信息，请检查配置文件")
+        await command.finish("未配置 MCSM 信息，请检查配置文件")
+        
     if args_text:
+        # 支持 /mcsm @实例名 命令 指定目标实例
+        target = {}
+        if args_text.startswith("@"):
+            name, _, args_text = args_text[1:].partition(" ")
+            try:
+                instance = await 注册表.按名称查找(name)
+            except Exception as e:
+                logger.error(f"查找实例 {name} 失败: {str(e)}")
+                await command.finish("获取实例列表失败，请查看日志")
+            if instance is None:
+                await command.finish(f"未找到名为 {name} 的实例，可使用 /mcsm实例 查看实例列表")
+            args_text = args_text.strip()
+            if not args_text:
+                await command.finish("用法：/mcsm @实例名 命令")
+            target = {"uuid": instance.uuid, "daemonid": instance.daemonid}
+            
         try:
-            logger.debug(f"创建面板管理实例，命令: {args_text}")
-            manager = 面板管理(args_text)
+            logger.debug(f"创建面板管理实例，命令: {args_text}, 目标: {target or '默认实例'}")
+            manager = 面板管理(args_text, **target)
             logger.debug("开始发送命令并获取日志")
-            result = manager.发送并获取日志()
-            logger.info(f"命令执行成功，返回结果长度: {len(result)}")
-            await command.finish(result)
+            result = await manager.发送并获取日志()
+            logger.info(f"命令执行成功，返回结果行数: {len(result)}")
+            await command.finish(result.文本)
         except Exception as e:
             logger.error(f"执行命令时出错: {str(e)}", exc_info=True)
 
@@ -189,8 +578,8 @@ async def _(matcher: Matcher, command_text: str = ArgPlainText("command")):
         logger.debug(f"创建面板管理实例，命令: {command_text}")
         manager = 面板管理(command_text)
         logger.debug("开始发送命令并获取日志")
-        result = manager.发送并获取日志()
-        logger.info(f"命令执行成功，返回结果长度: {len(result)}")
-        await matcher.finish(result)
+        result = await manager.发送并获取日志()
+        logger.info(f"命令执行成功，返回结果行数: {len(result)}")
+        await matcher.finish(result.文本)
     except Exception as e:
         logger.error(f"执行命令时出错: {str(e)}", exc_info=True)
\ No newline at end of file
@@ -0,0 +1,122 @@
+"""
+MCSM实例注册表模块
+在进程内按TTL缓存面板的实例列表，热路径上的实例查询只读内存
+"""
+
+import asyncio
+import time
+
+import nonebot
+from nonebot import logger
+
+config = nonebot.get_driver().config
+
+_缓存秒数 = float(getattr(config, "mcsm_instance_cache_ttl", 60))
+
+状态名称 = {-1: "忙碌", 0: "已停止", 1: "停止中", 2: "启动中", 3: "运行中"}
+
+
+class 实例信息:
+    __slots__ = ("uuid", "daemonid", "name", "status", "players")
+
+    def __init__(self, uuid, daemonid, name, status, players):
+        self.uuid = uuid
+        self.daemonid = daemonid
+        self.name = name
+        self.status = status
+        self.players = players
+
+    @property
+    def key(self):
+        return (self.uuid, self.daemonid)
+
+    @property
+    def 运行中(self):
+        return self.status == 3
+
+    @property
+    def 状态(self):
+        return 状态名称.get(self.status, "未知")
+
+    def __repr__(self):
+        return f"实例信息({self.name}, {self.状态})"
+
+
+class 实例注册表:
+    """
+    实例注册表
+
+    列表过期后先返回旧数据并在后台刷新，只有从未加载过时才会等待面板响应；
+    并发刷新只会请求一次面板。
+
+    Args:
+        加载 (callable): 返回实例字典列表的协程函数，通常为 面板管理().获取实例列表
+        ttl (float): 缓存秒数，默认使用配置 mcsm_instance_cache_ttl
+    """
+
+    def __init__(self, 加载, ttl=_缓存秒数):
+        self._加载 = 加载
+        self.ttl = ttl
+        self.更新时间 = None
+        self._实例 = []
+        self._按名称 = {}
+        self._lock = None
+        self._后台刷新 = None
+
+    @property
+    def 已过期(self):
+        return self.更新时间 is None or time.monotonic() - self.更新时间 > self.ttl
+
+    async def 刷新(self, force=False):
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        async with self._lock:
+            # 等锁期间其他协程可能已经刷新过
+            if not force and not self.已过期:
+                return self._实例
+            items = await self._加载()
+            self._实例 = [
+                实例信息(item["uuid"], item["daemonid"], item["name"], item["status"], item["players"])
+                for item in items
+                if item["uuid"]
+            ]
+            self._按名称 = {instance.name.lower(): instance for instance in self._实例}
+            self.更新时间 = time.monotonic()
+            logger.debug(f"实例注册表已刷新，共 {len(self._实例)} 个实例")
+            return self._实例
+
+    async def _确保可用(self):
+        if not self.已过期:
+            return
+        if self.更新时间 is None:
+            await self.刷新()
+        elif self._后台刷新 is None or self._后台刷新.done():
+            self._后台刷新 = asyncio.create_task(self._静默刷新())
+
+    async def _静默刷新(self):
+        try:
+            await self.刷新()
+        except Exception as e:
+            logger.warning(f"后台刷新实例注册表失败，继续使用旧数据: {str(e)}")
+
+    async def 全部实例(self):
+        await self._确保可用()
+        return list(self._实例)
+
+    async def 运行中实例(self):
+        return [instance for instance in await self.全部实例() if instance.运行中]
+
+    async def 按名称查找(self, name):
+        """
+        按实例名称查找实例（不区分大小写，也可以使用UUID前缀）
+
+        Returns:
+            实例信息 | None: 找到的实例
+        """
+        await self._确保可用()
+        key = name.lower()
+        instance = self._按名称.get(key)
+        if instance is None:
+            instance = next((item for item in self._实例 if item.uuid.lower().startswith(key)), None)
+        return instance
+
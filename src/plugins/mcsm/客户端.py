@@ -0,0 +1,48 @@
+"""
+MCSM HTTP客户端模块
+提供MCSM面板的共享HTTP客户端和面板请求的并发限制
+"""
+
+import asyncio
+
+import httpx
+import nonebot
+
+from ...utils.客户端工具 import 共享客户端
+
+config = nonebot.get_driver().config
+
+_客户端 = 共享客户端(
+    "MCSM",
+    base_url=getattr(config, "mcsm_api_url", ""),
+    headers={
+        "Content-Type": "application/json; charset=utf-8",
+        "X-Requested-With": "XMLHttpRequest",
+    },
+    timeout=httpx.Timeout(float(getattr(config, "mcsm_http_timeout", 10))),
+)
+_并发限制 = None
+
+
+def 获取客户端():
+    """
+    获取共享的MCSM异步HTTP客户端（首次调用时创建）
+
+    Returns:
+        httpx.AsyncClient: 启用keep-alive连接池的客户端
+    """
+    return _客户端.获取()
+
+
+def 获取并发限制():
+    """
+    获取面板请求的并发限制（并发数由配置 mcsm_max_concurrency 决定，默认4）
+
+    Returns:
+        asyncio.Semaphore: 所有并发提交的面板请求共用的信号量
+    """
+    global _并发限制
+    if _并发限制 is None:
+        _并发限制 = asyncio.Semaphore(max(1, int(getattr(config, "mcsm_max_concurrency", 4))))
+    return _并发限制
+
@@ -0,0 +1,204 @@
+"""
+MCSM日志解析模块
+提供预编译的日志行解析、按实例维护的增量读取游标和自适应日志窗口
+"""
+
+import asyncio
+import re
+from collections import deque
+from datetime import datetime
+from typing import NamedTuple
+
+_时间模式 = re.compile(r"(\d{2}):(\d{2}):(\d{2})")
+_颜色模式 = re.compile(r"\x1b\[[0-9;]*[A-Za-z]")
+
+_一天毫秒 = 86_400_000
+_锚点长度 = 256  # 用于在新日志中定位上次读取位置的尾部长度
+_最小窗口_kb = 1
+_最大窗口_kb = 1024
+
+
+class 日志行(NamedTuple):
+    时间戳: int  # 毫秒时间戳，无法解析时沿用上一行
+    内容: str
+
+
+class 命令结果:
+    """
+    单条命令（或一批命令）在日志中的输出结果
+    """
+
+    __slots__ = ("命令", "开始时间", "结束时间", "行")
+
+    def __init__(self, 命令, 开始时间, 结束时间, 行):
+        self.命令 = 命令
+        self.开始时间 = 开始时间
+        self.结束时间 = 结束时间
+        self.行 = 行
+
+    @property
+    def 文本(self):
+        return "\n".join(line.内容 for line in self.行)
+
+    def __len__(self):
+        return len(self.行)
+
+    def __str__(self):
+        return self.文本
+
+
+class 日志游标:
+    """
+    单个实例的增量日志读取游标
+
+    每次查询只解析上次读取位置之后的新内容，解析结果保存在有界环形缓存中；
+    当两次查询之间的新日志超出窗口时自动扩大窗口，新日志很少时逐步缩小窗口。
+    终端流订阅也通过 写入() 把推送的输出追加到同一个缓存。
+    """
+
+    def __init__(self, 缓存行数=2000):
+        self.窗口_kb = _最小窗口_kb
+        self.缓存 = deque(maxlen=缓存行数)
+        self._锚点 = ""
+        self._最后时间戳 = None
+        self._未完成 = ""
+        self._新行事件 = None
+
+    @property
+    def 窗口大小(self):
+        return f"{self.窗口_kb}kb"
+
+    def 预留窗口(self, size_kb):
+        """确保下一次查询的窗口不小于指定大小"""
+        self.窗口_kb = min(_最大窗口_kb, max(self.窗口_kb, size_kb))
+
+    def 解析(self, log_content, log_time):
+        """
+        解析一次日志查询的结果，只处理上次读取位置之后的新行
+
+        Args:
+            log_content (str): 接口返回的日志尾部内容
+            log_time (int): 接口返回的服务端毫秒时间戳
+
+        Returns:
+            bool: 是否已处理；False 表示两次查询之间的新日志超出了窗口，
+                窗口已扩大，需要重新查询
+        """
+        # 最后一行可能尚未输出完整，留到下次再处理
+        end = log_content.rfind("\n") + 1
+        complete = log_content[:end]
+
+        start = 0
+        overflowed = False
+        anchored = False
+        if self._锚点:
+            # 输出重复时锚点可能出现多次，上次读取的位置是最后一次出现处
+            pos = complete.rfind(self._锚点)
+            if pos >= 0:
+                start = pos + len(self._锚点)
+                anchored = True
+            elif len(log_content.encode("utf-8")) < self.窗口_kb * 1024:
+                # 返回内容未占满窗口，说明已是完整日志：锚点缺失是因为日志被重置
+                # （例如服务器重启清空了控制台），扩大窗口没有意义
+                self.窗口_kb = _最小窗口_kb
+            else:
+                overflowed = True
+                if self.窗口_kb < _最大窗口_kb:
+                    # 丢弃本次结果，扩大窗口后重新查询以免漏行
+                    self.窗口_kb = min(_最大窗口_kb, self.窗口_kb * 2)
+                    return False
+        new_content = complete[start:]
+        # 无法用锚点定位（没有锚点、日志被重置或已达最大窗口）时，跳过已缓存的行
+        known = set(self.缓存) if not anchored and self.缓存 else None
+        if complete:
+            self._锚点 = complete[-_锚点长度:]
+
+        self._追加行(new_content, log_time, known)
+
+        # 新日志远小于窗口时逐步缩小窗口，减少下次传输量
+        if not overflowed and self.窗口_kb > _最小窗口_kb and len(new_content) * 4 < self.窗口_kb * 1024:
+            self.窗口_kb = max(_最小窗口_kb, self.窗口_kb // 2)
+        return True
+
+    def 写入(self, text, log_time):
+        """
+        写入终端流推送的输出文本（可能在任意位置截断）
+
+        Args:
+            text (str): 推送的输出片段
+            log_time (int): 收到推送时的毫秒时间戳
+        """
+        text = self._未完成 + text
+        end = text.rfind("\n") + 1
+        self._未完成 = text[end:]
+        if end:
+            self._追加行(text[:end], log_time)
+
+    def 重置读取位置(self):
+        """丢弃HTTP查询的锚点，下次查询时按缓存内容去重"""
+        self._锚点 = ""
+        self._未完成 = ""
+
+    def _追加行(self, content, log_time, known=None):
+        # 每批内容只计算一次参考日期
+        reference = datetime.fromtimestamp(log_time / 1000)
+        midnight = int(reference.replace(hour=0, minute=0, second=0, microsecond=0).timestamp() * 1000)
+        current = self._最后时间戳
+        appended = False
+        for raw_line in content.splitlines():
+            line = _颜色模式.sub("", raw_line)
+            time_match = _时间模式.search(line)
+            if time_match:
+                h, m, s = time_match.groups()
+                current = midnight + (int(h) * 3600 + int(m) * 60 + int(s)) * 1000
+                # 跨零点时，晚于服务端当前时间的日志属于前一天
+                if current > log_time + 60_000:
+                    current -= _一天毫秒
+            if current is not None:
+                entry = 日志行(current, line)
+                if known is not None and entry in known:
+                    continue
+                self.缓存.append(entry)
+                appended = True
+        self._最后时间戳 = current
+        if appended and self._新行事件 is not None:
+            self._新行事件.set()
+
+    async def 等待新行(self, timeout):
+        """
+        等待新日志行写入缓存，最多等待 timeout 秒
+
+        Returns:
+            bool: 等待期间是否有新行
+        """
+        if self._新行事件 is None:
+            self._新行事件 = asyncio.Event()
+        self._新行事件.clear()
+        try:
+            await asyncio.wait_for(self._新行事件.wait(), timeout)
+            return True
+        except asyncio.TimeoutError:
+            return False
+
+    def 提取(self, 开始时间, 结束时间):
+        """
+        提取时间范围内的缓存日志行
+
+        Returns:
+            list: 日志行列表
+        """
+        return [line for line in self.缓存 if 开始时间 <= line.时间戳 <= 结束时间]
+
+
+_游标表 = {}
+
+
+def 获取游标(uuid, daemonid):
+    """
+    获取实例对应的日志游标（按实例共享，跨面板管理对象保留读取位置）
+    """
+    key = (uuid, daemonid)
+    cursor = _游标表.get(key)
+    if cursor is None:
+        cursor = _游标表[key] = 日志游标()
+    return cursor
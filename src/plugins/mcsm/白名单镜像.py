@@ -0,0 +1,91 @@
+"""
+服务器白名单本地镜像模块
+按实例保存服务器白名单的本地副本，用于O(1)判断游戏ID是否已在白名单中，
+从而跳过已在白名单中的游戏ID的添加命令
+"""
+
+import re
+import time
+
+# 匹配 whitelist list 的输出，例如:
+#   There are 3 whitelisted player(s): a, b, c
+#   There are 3 whitelisted players: a, b, c
+#   白名单中共有 3 名玩家: a, b, c
+_名单模式 = re.compile(r"(?:whitelisted players?(?:\(s\))?|白名单[^:：]*)[:：]\s*(.*)$", re.IGNORECASE)
+_空名单模式 = re.compile(r"no whitelisted players|白名单[^:：]*(?:为空|没有)", re.IGNORECASE)
+_分隔模式 = re.compile(r"[,，\s]+")
+
+
+def 解析白名单列表(lines):
+    """
+    从列表命令的输出中解析白名单
+
+    Args:
+        lines (list): 日志行文本列表
+
+    Returns:
+        list | None: 游戏ID列表，未找到列表输出时返回 None
+    """
+    for line in reversed(lines):
+        if _空名单模式.search(line):
+            return []
+        matched = _名单模式.search(line)
+        if matched:
+            return [name for name in _分隔模式.split(matched.group(1).strip()) if name]
+    return None
+
+
+def 是白名单列表(lines):
+    """判断日志中是否已出现列表命令的输出，用作命令完成条件"""
+    return any(_空名单模式.search(line.内容) or _名单模式.search(line.内容) for line in lines)
+
+
+class 白名单镜像:
+    """
+    单个实例的服务器白名单镜像
+
+    游戏ID按小写保存（Minecraft玩家名不区分大小写）。
+    未加载成功前 已加载 为 False，此时调用方不应依据镜像跳过命令。
+    """
+
+    def __init__(self, uuid, daemonid):
+        self.uuid = uuid
+        self.daemonid = daemonid
+        self.已加载 = False
+        self.更新时间 = 0
+        self._名单 = set()
+
+    def __contains__(self, game_id):
+        return game_id.lower() in self._名单
+
+    def __len__(self):
+        return len(self._名单)
+
+    def 载入(self, game_ids):
+        self._名单 = {game_id.lower() for game_id in game_ids}
+        self.已加载 = True
+        self.更新时间 = time.time()
+
+    def 添加(self, game_id):
+        self._名单.add(game_id.lower())
+
+    def 删除(self, game_id):
+        self._名单.discard(game_id.lower())
+
+
+_镜像表 = {}
+
+
+def 获取白名单镜像(uuid, daemonid):
+    """
+    获取实例对应的白名单镜像（不存在时创建一个未加载的镜像）
+    """
+    key = (uuid, daemonid)
+    mirror = _镜像表.get(key)
+    if mirror is None:
+        mirror = _镜像表[key] = 白名单镜像(uuid, daemonid)
+    return mirror
+
+
+def 全部白名单镜像():
+    return list(_镜像表.values())
@@ -0,0 +1,203 @@
+"""
+MCSM终端流订阅模块
+通过MCSM的终端流接口（socket.io）长期订阅实例的控制台输出，
+写入实例日志游标的环形缓存，命令结果直接从内存读取，无需每次下载日志
+需要安装可选依赖 stream（python-socketio），并配置 mcsm_terminal_stream=true 启用
+"""
+
+import asyncio
+import time
+
+import nonebot
+from nonebot import logger
+
+from .客户端 import 获取客户端
+from .日志引擎 import 获取游标
+
+try:
+    import socketio
+except ImportError:  # 未安装 python-socketio 时回退到HTTP日志查询
+    socketio = None
+
+driver = nonebot.get_driver()
+config = driver.config
+
+_重连最大间隔 = 30
+
+
+class 终端订阅:
+    """
+    单个实例的终端流订阅
+
+    使用方法:
+    1. 创建并启动: 订阅 = 终端订阅(uuid, daemonid); await 订阅.启动()
+    2. 已连接时，面板管理.查询日志 直接从游标缓存读取结果
+    3. 停止: await 订阅.停止()
+    """
+
+    def __init__(self, uuid, daemonid):
+        self.uuid = uuid
+        self.daemonid = daemonid
+        self.cursor = 获取游标(uuid, daemonid)
+        self.已连接 = False
+        self._task = None
+        self._sio = None
+
+    async def 启动(self):
+        if socketio is None:
+            logger.warning("未安装 python-socketio，终端流订阅不可用，将继续使用HTTP日志查询")
+            return False
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._运行())
+        return True
+
+    async def 停止(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self._断开()
+
+    async def _运行(self):
+        delay = 1
+        while True:
+            try:
+                await self._连接()
+                delay = 1
+                await self._sio.wait()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"终端流订阅连接失败，UUID: {self.uuid}，{delay}秒后重试: {e}")
+            await self._断开()
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, _重连最大间隔)
+
+    async def _连接(self):
+        # 1. 向面板申请终端流通道，获得守护进程地址和一次性密码
+        params = {"apikey": config.mcsm_api_key, "uuid": self.uuid, "daemonId": self.daemonid}
+        response = await 获取客户端().post("/api/protected_instance/stream_channel", params=params)
+        if response.status_code != 200:
+            raise Exception(f"申请终端流通道失败: HTTP {response.status_code}")
+        channel = response.json()["data"]
+        addr = channel["addr"]
+        if "://" not in addr:
+            scheme = "https" if config.mcsm_api_url.startswith("https") else "http"
+            addr = f"{scheme}://{addr}"
+
+        # 2. 连接守护进程并完成鉴权
+        sio = socketio.AsyncClient(reconnection=False)
+        authed = asyncio.get_running_loop().create_future()
+
+        @sio.on("stream/auth")
+        async def _鉴权结果(packet):
+            if not authed.done():
+                authed.set_result(bool(packet and packet.get("data")))
+
+        @sio.on("instance/stdout")
+        async def _输出(packet):
+            text = (packet or {}).get("data", {}).get("text")
+            if text:
+                self.cursor.写入(text, int(time.time() * 1000))
+
+        @sio.event
+        async def disconnect():
+            self._标记断开()
+
+        self._sio = sio
+        await sio.connect(
+            addr,
+            socketio_path=f"{channel.get('prefix', '')}/socket.io",
+            transports=["websocket"],
+        )
+        await sio.emit("stream/auth", {"data": {"password": channel["password"]}})
+        if not await asyncio.wait_for(authed, 10):
+            raise Exception("终端流鉴权失败")
+        self.已连接 = True
+        logger.info(f"终端流订阅已连接，UUID: {self.uuid}")
+
+    async def _断开(self):
+        self._标记断开()
+        if self._sio is not None:
+            try:
+                await self._sio.disconnect()
+            except Exception:
+                pass
+            self._sio = None
+
+    def _标记断开(self):
+        if self.已连接:
+            logger.warning(f"终端流订阅已断开，UUID: {self.uuid}，回退到HTTP日志查询")
+            # 回退到HTTP查询时按缓存去重，避免重复追加
+            self.cursor.重置读取位置()
+        self.已连接 = False
+
+
+class 本地终端源:
+    """
+    终端流订阅的本地替身，供测试或离线调试使用
+
+    与 终端订阅 接口一致，通过 推送() 直接向实例游标写入输出。
+    """
+
+    def __init__(self, uuid, daemonid):
+        self.uuid = uuid
+        self.daemonid = daemonid
+        self.cursor = 获取游标(uuid, daemonid)
+        self.已连接 = False
+
+    async def 启动(self):
+        self.已连接 = True
+        return True
+
+    async def 停止(self):
+        self.已连接 = False
+
+    def 推送(self, text, log_time=None):
+        self.cursor.写入(text, log_time or int(time.time() * 1000))
+
+
+_订阅表 = {}
+
+
+def 获取订阅(uuid, daemonid):
+    """
+    获取实例当前的终端流订阅，未订阅时返回 None
+    """
+    return _订阅表.get((uuid, daemonid))
+
+
+async def 订阅终端(uuid, daemonid, 源=None):
+    """
+    为实例启动终端流订阅（已订阅时直接返回现有订阅）
+
+    Args:
+        uuid (str): 实例UUID
+        daemonid (str): 守护进程ID
+        源 (optional): 自定义订阅源（如 本地终端源），默认使用MCSM终端流
+
+    Returns:
+        终端订阅 | 本地终端源: 订阅对象
+    """
+    key = (uuid, daemonid)
+    subscription = _订阅表.get(key)
+    if subscription is None:
+        subscription = 源 or 终端订阅(uuid, daemonid)
+        _订阅表[key] = subscription
+        await subscription.启动()
+    return subscription
+
+
+async def 取消订阅(uuid, daemonid):
+    subscription = _订阅表.pop((uuid, daemonid), None)
+    if subscription is not None:
+        await subscription.停止()
+
+
+@driver.on_shutdown
+async def _停止全部订阅():
+    for uuid, daemonid in list(_订阅表):
+        await 取消订阅(uuid, daemonid)
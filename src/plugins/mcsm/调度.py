@@ -0,0 +1,195 @@
+"""
+MCSM多实例调度模块
+将同一条命令并行发送到多个实例（每个实例内部按队列串行执行），并汇总各实例结果
+"""
+
+import asyncio
+from datetime import datetime
+
+import nonebot
+from nonebot import logger, require
+
+from .终端订阅 import 订阅终端
+from .command import (
+    注册表,
+    面板管理,
+    结果_已添加,
+    结果_已存在,
+    结果_已删除,
+    结果_不存在,
+    结果_错误,
+    结果_未确认,
+)
+
+require("nonebot_plugin_apscheduler")
+from nonebot_plugin_apscheduler import scheduler
+
+driver = nonebot.get_driver()
+config = driver.config
+
+
+class 实例:
+    __slots__ = ("uuid", "daemonid", "name")
+
+    def __init__(self, uuid, daemonid, name=None):
+        self.uuid = uuid
+        self.daemonid = daemonid
+        self.name = name or uuid[:8]
+
+    @property
+    def key(self):
+        return (self.uuid, self.daemonid)
+
+    def __repr__(self):
+        return f"实例({self.name})"
+
+
+def 配置实例列表():
+    """
+    读取需要同步白名单的实例列表
+
+    优先使用配置 mcsm_instances（[{"uuid": ..., "daemonid": ..., "name": ...}, ...]），
+    未配置时使用单实例配置 mcsm_uuid / mcsm_daemonid。
+
+    Returns:
+        list: 实例列表
+    """
+    instances = getattr(config, "mcsm_instances", None)
+    if instances:
+        return [
+            实例(item["uuid"], item.get("daemonid") or item.get("daemonId"), item.get("name"))
+            for item in instances
+        ]
+    uuid = getattr(config, "mcsm_uuid", None)
+    daemonid = getattr(config, "mcsm_daemonid", None)
+    if uuid and daemonid:
+        return [实例(uuid, daemonid)]
+    return []
+
+
+async def _逐实例执行(instances, 操作):
+    instances = instances if instances is not None else 配置实例列表()
+    if not instances:
+        raise ValueError("未配置任何MCSM实例")
+    # 不同实例并行执行；同一实例内由实例锁排队，保证日志归属正确
+    results = await asyncio.gather(
+        *(操作(面板管理(uuid=instance.uuid, daemonid=instance.daemonid)) for instance in instances),
+        return_exceptions=True,
+    )
+    for instance, result in zip(instances, results):
+        if isinstance(result, BaseException):
+            logger.error(f"实例 {instance.name} 执行失败: {result}")
+    return dict(zip(instances, results))
+
+
+async def 广播命令(command, instances=None, timeout=None):
+    """
+    将命令并行发送到多个实例
+
+    Args:
+        command (str): 命令
+        instances (list, optional): 实例列表，默认使用 配置实例列表()
+        timeout (float, optional): 每个实例等待结果的最长秒数
+
+    Returns:
+        dict: {实例: 命令结果 或 异常}
+    """
+    return await _逐实例执行(instances, lambda manager: manager.发送并获取日志(command, timeout=timeout))
+
+
+async def 广播白名单(action, game_ids, instances=None):
+    """
+    将白名单增删命令批量并行发送到多个实例
+
+    Args:
+        action (str): add 或 remove
+        game_ids (list): 游戏ID列表
+        instances (list, optional): 实例列表，默认使用 配置实例列表()
+
+    Returns:
+        dict: {实例: {game_id: {"状态": 结果状态, "日志": [日志行]}} 或 异常}
+    """
+    if action == "add":
+        return await _逐实例执行(instances, lambda manager: manager.批量添加白名单(game_ids))
+    return await _逐实例执行(instances, lambda manager: manager.批量删除白名单(game_ids))
+
+
+def 汇总白名单结果(game_ids, per_instance):
+    """
+    将各实例的白名单结果汇总为每个游戏ID的总体结果
+
+    任一实例出错（或整个实例调用失败）即视为错误；否则取“改变了状态”的结果优先。
+
+    Args:
+        game_ids (list): 游戏ID列表
+        per_instance (dict): 广播白名单() 的返回值
+
+    Returns:
+        dict: {game_id: {"状态": 结果状态, "日志": [日志行], "实例": {实例名: 结果状态}}}
+    """
+    priority = {结果_错误: 0, 结果_已添加: 1, 结果_已删除: 1, 结果_未确认: 2, 结果_已存在: 3, 结果_不存在: 3}
+    summary = {game_id: {"状态": None, "日志": [], "实例": {}} for game_id in game_ids}
+    for instance, results in per_instance.items():
+        for game_id in game_ids:
+            entry = summary[game_id]
+            if isinstance(results, BaseException):
+                status, lines = 结果_错误, [f"[{instance.name}] {results}"]
+            else:
+                result = results.get(game_id, {"状态": 结果_未确认, "日志": []})
+                status, lines = result["状态"], [f"[{instance.name}] {line}" for line in result["日志"]]
+            entry["实例"][instance.name] = status
+            entry["日志"].extend(lines)
+            if entry["状态"] is None or priority[status] < priority[entry["状态"]]:
+                entry["状态"] = status
+    for entry in summary.values():
+        entry["状态"] = entry["状态"] or 结果_未确认
+    return summary
+
+
+async def 定时刷新白名单镜像():
+    """
+    定时刷新各实例的服务器白名单镜像，纠正面板外手动增删造成的偏差
+    """
+    try:
+        await _逐实例执行(None, lambda manager: manager.刷新白名单镜像())
+    except Exception as e:
+        logger.error(f"刷新白名单镜像失败: {str(e)}")
+
+
+async def 定时刷新实例注册表():
+    """
+    定时刷新实例注册表，使实例查询始终命中内存缓存（注册表被使用过之后才开始刷新）
+    """
+    if 注册表.更新时间 is None:
+        return
+    try:
+        await 注册表.刷新(force=True)
+    except Exception as e:
+        logger.error(f"刷新实例注册表失败: {str(e)}")
+
+
+# 只在相关配置存在时注册定时任务，未配置MCSM时不会每隔几分钟报错
+if getattr(config, "mcsm_whitelist_list_command", None) and 配置实例列表():
+    scheduler.add_job(
+        定时刷新白名单镜像,
+        "interval",
+        minutes=int(getattr(config, "mcsm_whitelist_refresh_minutes", 30)),
+        id="mcsm_whitelist_mirror",
+        next_run_time=datetime.now(),
+    )
+
+if getattr(config, "mcsm_api_url", None) and getattr(config, "mcsm_api_key", None):
+    scheduler.add_job(
+        定时刷新实例注册表,
+        "interval",
+        seconds=max(10, int(注册表.ttl)),
+        id="mcsm_instance_registry",
+    )
+
+
+@driver.on_startup
+async def _启动终端订阅():
+    if not getattr(config, "mcsm_terminal_stream", False):
+        return
+    for instance in 配置实例列表():
+        await 订阅终端(instance.uuid, instance.daemonid)
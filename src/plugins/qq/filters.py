@@ -4,214 +4,121 @@
 """
 
 import re
-from nonebot import logger
+from ...utils.日志工具 import 信息
 
 
-def is_valid_user_data(item):
+class 过滤规则:
     """
-    验证用户数据是否有效
-    
-    Args:
-        item (dict): 用户数据项
-        
-    Returns:
-        bool: 数据是否有效
-    """
-    if not item or not isinstance(item, dict):
-        return False
-        
-    fields = item.get("fields", {})
-    qq = fields.get("QQ号码", [{}])[0].get("text", "")
-    game_id = fields.get("游戏ID", [{}])[0].get("text", "")
-    
-    # 只有当QQ号和游戏ID都不为空时，才认为是有效数据
-    return qq.strip() and game_id.strip()
-
-
-def extract_user_info(item):
-    """
-    从用户数据项中提取用户信息
-    
-    Args:
-        item (dict): 用户数据项
-        
-    Returns:
-        dict: 包含qq、game_id和score的字典，如果提取失败则返回None
-    """
-    if not item or not isinstance(item, dict):
-        return None
-        
-    fields = item.get("fields", {})
-    qq = fields.get("QQ号码", [{}])[0].get("text", "")
-    game_id = fields.get("游戏ID", [{}])[0].get("text", "")
-    score = (
-        fields.get("总分", {}).get("value", [0])[0]
-        if isinstance(fields.get("总分"), dict)
-        else "未知"
-    )
-    
-    return {
-        "qq": qq,
-        "game_id": game_id,
-        "score": score
-    }
-
-
-def filter_valid_users(items):
-    """
-    过滤出有效的用户数据（基础验证）
-    
-    Args:
-        items (list): 用户数据列表
-        
-    Returns:
-        list: 有效用户数据列表
-    """
-    valid_items = []
-    invalid_items_count = 0
-    
-    for idx, item in enumerate(items):
-        logger.debug(f"处理第 {idx+1} 条用户数据: {item}")
-        if is_valid_user_data(item):
-            valid_items.append(item)
-            logger.debug(f"第 {idx+1} 条数据有效，已添加到有效数据列表")
-        else:
-            invalid_items_count += 1
-            logger.debug(f"第 {idx+1} 条数据无效，QQ或游戏ID为空，已跳过")
-    
-    logger.info(f"过滤后得到 {len(valid_items)} 个有效用户提交记录，{invalid_items_count} 个无效记录被过滤")
-    logger.debug(f"有效用户数据详情: {valid_items}")
-    return valid_items
-
-
-def filter_duplicate_game_ids(items):
-    """
-    游戏ID相同时过滤仅保留最新的记录
-    
-    Args:
-        items (list): 用户数据列表
-        
-    Returns:
-        list: 去重后的用户数据列表
-    """
-    game_id_map = {}  # {game_id: (timestamp, item)}
-    
-    for item in items:
-        fields = item.get("fields", {})
-        game_id = fields.get("游戏ID", [{}])[0].get("text", "")
-        timestamp = item.get("created_time", 0)  # 使用记录创建时间
-        
-        if not game_id:
-            continue
-            
-        # 如果游戏ID已存在，且当前记录更新，则替换
-        if game_id in game_id_map:
-            if timestamp > game_id_map[game_id][0]:
-                game_id_map[game_id] = (timestamp, item)
-                logger.debug(f"游戏ID {game_id} 发现更新记录，已替换")
-        else:
-            game_id_map[game_id] = (timestamp, item)
-            logger.debug(f"游戏ID {game_id} 首次记录")
-    
-    # 提取去重后的记录
-    filtered_items = [item for _, (_, item) in game_id_map.items()]
-    logger.info(f"游戏ID去重后剩余 {len(filtered_items)} 条记录，过滤掉 {len(items) - len(filtered_items)} 条重复记录")
-    return filtered_items
-
-
-def filter_duplicate_qq_numbers(items):
-    """
-    QQ号相同时过滤仅保留最新的记录
-    
-    Args:
-        items (list): 用户数据列表
-        
-    Returns:
-        list: 去重后的用户数据列表
-    """
-    qq_map = {}  # {qq: (timestamp, item)}
-    
-    for item in items:
-        fields = item.get("fields", {})
-        qq = fields.get("QQ号码", [{}])[0].get("text", "")
-        timestamp = item.get("created_time", 0)  # 使用记录创建时间
-        
-        if not qq:
-            continue
-            
-        # 如果QQ号已存在，且当前记录更新，则替换
-        if qq in qq_map:
-            if timestamp > qq_map[qq][0]:
-                qq_map[qq] = (timestamp, item)
-                logger.debug(f"QQ号 {qq} 发现更新记录，已替换")
-        else:
-            qq_map[qq] = (timestamp, item)
-            logger.debug(f"QQ号 {qq} 首次记录")
-    
-    # 提取去重后的记录
-    filtered_items = [item for _, (_, item) in qq_map.items()]
-    logger.info(f"QQ号去重后剩余 {len(filtered_items)} 条记录，过滤掉 {len(items) - len(filtered_items)} 条重复记录")
-    return filtered_items
-
-
-def filter_invalid_game_ids(items):
-    """
-    过滤不符合正则表达式 ^[0-9a-zA-Z_]{3,16}$ 的游戏ID
-    
+    单条记录的过滤规则
+
     Args:
-        items (list): 用户数据列表
-        
-    Returns:
-        list: 格式验证通过的用户数据列表
+        名称 (str): 规则名称，用作拒绝计数的键
+        检查 (callable): 接收申请记录、返回是否通过的函数
     """
-    valid_items = []
-    invalid_items_count = 0
-    pattern = re.compile(r"^[0-9a-zA-Z_]{3,16}$")
-    
-    for idx, item in enumerate(items):
-        fields = item.get("fields", {})
-        game_id = fields.get("游戏ID", [{}])[0].get("text", "")
-        
-        if pattern.match(game_id):
-            valid_items.append(item)
-            logger.debug(f"第 {idx+1} 条数据的游戏ID {game_id} 符合规范")
-        else:
-            invalid_items_count += 1
-            logger.debug(f"第 {idx+1} 条数据的游戏ID {game_id} 不符合规范，已过滤")
-    
-    logger.info(f"游戏ID格式验证后剩余 {len(valid_items)} 条记录，过滤掉 {invalid_items_count} 条格式不正确的记录")
-    return valid_items
-
-
-def apply_filters(items):
+
+    __slots__ = ("名称", "检查")
+
+    def __init__(self, 名称, 检查):
+        self.名称 = 名称
+        self.检查 = 检查
+
+
+def 游戏ID格式规则(pattern=r"^[0-9a-zA-Z_]{3,16}$"):
+    """创建游戏ID格式规则（正则在创建时编译一次）"""
+    match = re.compile(pattern).match
+    return 过滤规则("游戏ID格式", lambda record: match(record.game_id) is not None)
+
+
+# 默认规则：基础有效性、游戏ID格式
+默认规则 = (
+    过滤规则("空数据", lambda record: bool(record.qq and record.game_id)),
+    游戏ID格式规则(),
+)
+
+
+class 过滤引擎:
     """
-    应用所有过滤器到用户数据
-    
+    单遍过滤引擎
+
+    每条记录只遍历一次：依次执行逐条规则，通过后立即按游戏ID保留最新的记录；
+    全部数据输入后再在游戏ID去重的结果上按QQ号保留最新的记录。
+    结果与依次执行有效性、格式、游戏ID去重、QQ号去重四个过滤器完全一致。
+    可以逐页调用 输入()，内存中只保留每个游戏ID当前最新的一条记录。
+
     Args:
-        items (list): 原始用户数据列表
-        
-    Returns:
-        list: 经过所有过滤器处理后的用户数据列表
+        规则 (iterable): 逐条过滤规则，按顺序执行，第一条不通过的规则计入拒绝数
+        拒绝回调 (callable, optional): 记录被拒绝时以 (记录, 规则名称) 调用
     """
-    logger.info(f"开始对 {len(items)} 条用户数据应用过滤器")
-    
-    # 1. 基础有效性过滤
-    valid_items = filter_valid_users(items)
-    if not valid_items:
-        return []
-    
-    # 2. 游戏ID格式过滤
-    valid_items = filter_invalid_game_ids(valid_items)
-    if not valid_items:
-        return []
-    
-    # 3. 游戏ID重复过滤（保留最新）
-    valid_items = filter_duplicate_game_ids(valid_items)
-    if not valid_items:
-        return []
-    
-    # 4. QQ号重复过滤（保留最新）
-    valid_items = filter_duplicate_qq_numbers(valid_items)
-    
-    logger.info(f"所有过滤器应用完成，最终剩余 {len(valid_items)} 条有效记录")
-    return valid_items
\ No newline at end of file
+
+    def __init__(self, 规则=默认规则, 拒绝回调=None):
+        self.规则 = tuple(规则)
+        self.拒绝回调 = 拒绝回调
+        self.总数 = 0
+        self.拒绝计数 = {rule.名称: 0 for rule in self.规则}
+        self.拒绝计数["游戏ID重复"] = 0
+        self.拒绝计数["QQ号重复"] = 0
+        self._按游戏ID = {}  # {game_id: 申请记录}
+
+    def 输入(self, items):
+        """
+        输入一批记录（可以是单页数据）
+
+        Args:
+            items (list): 申请记录列表
+
+        Returns:
+            过滤引擎: self，便于链式调用
+        """
+        checks = [(rule.名称, rule.检查) for rule in self.规则]
+        counts = self.拒绝计数
+        by_game_id = self._按游戏ID
+        reject = self.拒绝回调
+        duplicates = 0
+        for record in items:
+            for name, check in checks:
+                if not check(record):
+                    counts[name] += 1
+                    if reject is not None:
+                        reject(record, name)
+                    break
+            else:
+                current = by_game_id.get(record.game_id)
+                if current is None:
+                    by_game_id[record.game_id] = record
+                else:
+                    duplicates += 1
+                    # 创建时间相同时保留先出现的记录
+                    if record.created_time > current.created_time:
+                        by_game_id[record.game_id] = record
+                        current, record = record, current
+                    if reject is not None:
+                        reject(record, "游戏ID重复")
+        counts["游戏ID重复"] += duplicates
+        self.总数 += len(items)
+        return self
+
+    def 结果(self):
+        """
+        完成QQ号去重并返回最终记录
+
+        Returns:
+            list: 通过全部过滤的申请记录
+        """
+        by_qq = {}
+        duplicates = 0
+        for record in self._按游戏ID.values():
+            current = by_qq.get(record.qq)
+            if current is None:
+                by_qq[record.qq] = record
+            else:
+                duplicates += 1
+                if record.created_time > current.created_time:
+                    by_qq[record.qq] = record
+                    current, record = record, current
+                if self.拒绝回调 is not None:
+                    self.拒绝回调(record, "QQ号重复")
+        self.拒绝计数["QQ号重复"] = duplicates
+        result = list(by_qq.values())
+        信息("过滤完成：输入 {} 条，保留 {} 条，拒绝 {}", self.总数, len(result), self.拒绝计数)
+        return result
+
@@ -2,7 +2,7 @@ import nonebot
 from nonebot.exception import IgnoredException
 from nonebot.message import event_preprocessor
 from nonebot.adapters.onebot.v11 import GroupMessageEvent
-from nonebot import logger
+from ...utils.日志工具 import 调试
 
 # 获取配置中的白名单群组ID列表
 config = nonebot.get_driver().config
@@ -10,17 +10,23 @@ config = nonebot.get_driver().config
 whitelist_group_ids = getattr(config, "whitelist_group_ids", [])
 
 # 如果是单个ID则转为列表
-if whitelist_group_ids and not isinstance(whitelist_group_ids, list):
+if whitelist_group_ids and not isinstance(whitelist_group_ids, (list, tuple, set, frozenset)):
     whitelist_group_ids = [whitelist_group_ids]
 
+# 启动时转换为整数集合，每个事件只做一次哈希查找（配置中的群号可能是字符串）
+whitelist_group_ids = frozenset(int(group_id) for group_id in whitelist_group_ids)
+
 
 def get_group_id_from_event(event):
     """
     从事件中提取群组ID
     """
-    if hasattr(event, 'group_id'):
-        return event.group_id
-    return None
+    return getattr(event, "group_id", None)
+
+
+def 允许的群(group_id):
+    """群是否允许处理（未配置白名单时允许所有群）"""
+    return not whitelist_group_ids or group_id in whitelist_group_ids
 
 
 @event_preprocessor
@@ -35,16 +41,10 @@ async def group_whitelist_filter(event):
         # 如果事件不包含群组信息，则允许通过
         return
     
-    # 如果没有配置白名单，则允许所有群组消息通过
-    if not whitelist_group_ids:
-        logger.debug("未配置白名单群组，允许所有群组消息通过")
-        return
-    
-    # 检查群组ID是否在白名单中
-    if group_id in whitelist_group_ids:
-        logger.debug(f"群组 {group_id} 在白名单中，允许消息通过")
+    # 未配置白名单或群组在白名单中时允许通过
+    if 允许的群(group_id):
         return
     else:
-        logger.debug(f"群组 {group_id} 不在白名单中，忽略该消息")
+        调试("群组 {} 不在白名单中，忽略该消息", group_id, every=100)
         # 抛出IgnoredException异常，使事件处理流程中断
         raise IgnoredException("群组不在白名单中")
\ No newline at end of file
@@ -1,10 +1,28 @@
 import nonebot
-import requests
 from nonebot import logger, on_command
 from nonebot.adapters.onebot.v11 import MessageEvent
 from nonebot.adapters import Message
 from nonebot.permission import SUPERUSER
 from nonebot.params import CommandArg
+import httpx
+from ...utils.日志工具 import 调试, 摘要
+from ...utils.缓存工具 import 结果缓存
+from ...utils.客户端工具 import 共享客户端
+
+config = nonebot.get_driver().config
+
+_客户端 = 共享客户端(
+    "QQ资料接口",
+    base_url="https://api.shwgij.com",
+    timeout=httpx.Timeout(float(getattr(config, "qq_info_http_timeout", 10))),
+)
+
+# 资料查询结果缓存：成功结果缓存较久，查无此人的结果缓存较短
+_资料缓存 = 结果缓存(
+    ttl=float(getattr(config, "qq_info_cache_ttl", 86400)),
+    max_size=int(getattr(config, "qq_info_cache_size", 2048)),
+    negative_ttl=float(getattr(config, "qq_info_negative_cache_ttl", 600)),
+)
 
 get_user_info = on_command("get_user", aliases={"获取QQ信息"}, priority=5,permission=SUPERUSER)
 
@@ -44,41 +62,46 @@ async def handle_user_info_command(event: MessageEvent,args: Message = CommandAr
     #     await get_user_info.finish("未能获取用户信息")
 
 
+async def _查询资料(qq_number):
+    """
+    请求资料接口；网络或HTTP错误时抛出异常（不写入缓存），查无此人时返回 None
+    """
+    key = config.shwgij_key  # 从配置中获取API密钥
+    response = await _客户端.获取().get("/api/qq/qqinfo", params={"key": key, "qq": qq_number})
+    调试("Response Status Code: {}, Content: {}", response.status_code, lambda: 摘要(response.text))
+    response.raise_for_status()
+    data = response.json()
+    
+    # 提取指定字段
+    user_data = (data.get("data") or {}).get("mRes") or {}
+    if not user_data:
+        return None
+    extracted_data = {
+        "Name": user_data.get("sNickName"),
+        "FaceUrl": user_data.get("sFaceUrl"),
+        "QQLevel": user_data.get("iQQLevel"),
+        "Day": user_data.get("iTotalActiveDay")
+    }
+    调试("Extracted User Data: {}", extracted_data)
+    return extracted_data
+
+
 async def fetch_user_info(qq_number):
     """
     获取QQ用户信息并提取指定字段
     
+    结果按QQ号缓存（LRU+TTL，查无此人的结果也会短时间缓存），
+    同一QQ号的并发查询只请求一次接口
+    
     Args:
         qq_number (str): QQ号码
         
     Returns:
-        dict: 包含指定字段的用户信息
+        dict: 包含指定字段的用户信息，获取失败时返回 None
     """
-    # 构建请求URL
+    qq_number = str(qq_number).strip()
     try:
-        key = nonebot.get_driver().config.shwgij_key  # 从配置中获取API密钥
-        url = f"https://api.shwgij.com/api/qq/qqinfo?key={key}&qq={qq_number}"
-        
-        response = requests.get(url)
-        logger.debug(f"Response Status Code: {response.status_code}")
-        logger.debug(f"Response Content: {response.text}")
-        data = response.json()
-        
-        # 检查请求是否成功
-        if response.status_code == 200:
-            # 提取指定字段
-            user_data = data.get("data", {}).get("mRes", {})
-            extracted_data = {
-                "Name": user_data.get("sNickName"),
-                "FaceUrl": user_data.get("sFaceUrl"),
-                "QQLevel": user_data.get("iQQLevel"),
-                "Day": user_data.get("iTotalActiveDay")
-            }
-            logger.debug(f"Extracted User Data: {extracted_data}")
-            return extracted_data
-        else:
-            return None
-            
+        return await _资料缓存.获取(qq_number, lambda: _查询资料(qq_number))
     except Exception as e:
         logger.error(f"获取用户信息时出错: {e}")
         return None
@@ -0,0 +1,133 @@
+"""
+白名单申请处理记录模块
+持久化每条飞书申请记录的处理结果，重复执行添加任务时跳过已经处理完毕的记录
+"""
+
+import os
+import time
+
+import nonebot
+from nonebot import logger
+
+from ...utils.数据库工具 import SQLite数据库
+
+config = nonebot.get_driver().config
+
+DB_FILE = os.path.abspath(getattr(config, "qq_processed_db", os.path.join("data", "processed_records.db")))
+
+# 处理结果
+结果_已添加 = "added"
+结果_已拒绝 = "rejected"
+结果_失败 = "failed"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS processed (
+    record_id  TEXT PRIMARY KEY,
+    qq         TEXT NOT NULL DEFAULT '',
+    game_id    TEXT NOT NULL DEFAULT '',
+    outcome    TEXT NOT NULL,
+    reason     TEXT NOT NULL DEFAULT '',
+    updated_at REAL NOT NULL
+);
+"""
+
+
+class 处理记录库:
+    """
+    申请记录处理结果存储
+
+    启动后首次使用时把全部记录载入内存（每条只保存QQ号、游戏ID和结果），
+    查询是一次字典查找；新结果先写入内存，任务结束时批量写入SQLite。
+    已添加和已拒绝的记录视为处理完毕；失败的记录下次仍会重试。
+    记录的QQ号或游戏ID在飞书中被修改后视为新记录重新处理。
+    """
+
+    def __init__(self, db_file=DB_FILE):
+        self.db_file = db_file
+        self._db = SQLite数据库(db_file, _SCHEMA)
+        self._记录 = None  # {record_id: (qq, game_id, outcome)}
+        self._待写入 = {}  # {record_id: row}
+
+    async def 载入(self):
+        """从SQLite载入全部处理结果（只在首次调用时执行）"""
+        if self._记录 is not None:
+            return
+
+        def _load(conn):
+            return conn.execute("SELECT record_id, qq, game_id, outcome FROM processed").fetchall()
+        rows = await self._db.执行(_load)
+        if self._记录 is None:
+            self._记录 = {record_id: (qq, game_id, outcome) for record_id, qq, game_id, outcome in rows}
+            logger.info(f"已载入 {len(self._记录)} 条申请处理记录")
+
+    def 已处理(self, record):
+        """
+        判断记录是否已经处理完毕（已添加或已拒绝，且QQ号和游戏ID未修改）
+
+        Args:
+            record (申请记录): 飞书申请记录
+
+        Returns:
+            bool: 是否可以跳过
+        """
+        entry = self._记录.get(record.record_id) if self._记录 else None
+        return (
+            entry is not None
+            and entry[2] != 结果_失败
+            and entry[0] == record.qq
+            and entry[1] == record.game_id
+        )
+
+    def 标记(self, record, outcome, reason=""):
+        """
+        记录一条申请的处理结果（调用 保存() 后写入SQLite）
+
+        Args:
+            record (申请记录): 飞书申请记录
+            outcome (str): 结果_已添加 / 结果_已拒绝 / 结果_失败
+            reason (str): 拒绝或失败的原因
+        """
+        if not record.record_id:
+            return
+        if self._记录 is None:
+            self._记录 = {}
+        self._记录[record.record_id] = (record.qq, record.game_id, outcome)
+        self._待写入[record.record_id] = (record.record_id, record.qq, record.game_id, outcome, reason, time.time())
+
+    def 拒绝(self, record, reason):
+        """过滤引擎的拒绝回调"""
+        self.标记(record, 结果_已拒绝, reason)
+
+    async def 保存(self):
+        """
+        把内存中新增的结果批量写入SQLite
+
+        Returns:
+            int: 写入的记录数
+        """
+        rows, self._待写入 = list(self._待写入.values()), {}
+        if not rows:
+            return 0
+
+        def _write(conn, rows):
+            with conn:
+                conn.executemany(
+                    "INSERT OR REPLACE INTO processed (record_id, qq, game_id, outcome, reason, updated_at) "
+                    "VALUES (?, ?, ?, ?, ?, ?)",
+                    rows,
+                )
+        await self._db.执行(_write, rows)
+        return len(rows)
+
+    async def 关闭(self):
+        await self._db.关闭()
+
+
+# 进程内共享的处理记录
+处理记录 = 处理记录库()
+
+
+@nonebot.get_driver().on_shutdown
+async def _关闭处理记录():
+    await 处理记录.保存()
+    await 处理记录.关闭()
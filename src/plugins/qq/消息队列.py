@@ -0,0 +1,162 @@
+"""
+群消息发送队列模块
+合并短时间内发往同一个群的消息，过长的内容拆分为多段或合并转发，并限制发送频率，
+避免突发的大量消息被丢弃或导致机器人被风控禁言
+"""
+
+import asyncio
+
+import nonebot
+from nonebot import logger
+
+config = nonebot.get_driver().config
+
+_合并窗口 = float(getattr(config, "qq_message_coalesce_window", 1.0))  # 秒
+_最大长度 = int(getattr(config, "qq_message_max_length", 2000))  # 单条消息的最大字符数
+_转发阈值 = int(getattr(config, "qq_message_forward_threshold", 3))  # 超过该段数时改用合并转发
+_发送间隔 = float(getattr(config, "qq_message_interval", 1.5))  # 两次发送之间的最小秒数
+_重试次数 = 2
+
+_发送锁 = None
+_上次发送 = 0.0
+
+
+def 分段(text, limit=_最大长度):
+    """
+    按行把文本拆分为不超过 limit 个字符的若干段
+
+    只在换行处断开，CQ码不会被截断；单行超长时才按长度硬拆。
+
+    Returns:
+        list: 文本段列表
+    """
+    chunks = []
+    current = []
+    size = 0
+    for line in text.split("\n"):
+        while len(line) > limit:
+            if current:
+                chunks.append("\n".join(current))
+                current, size = [], 0
+            chunks.append(line[:limit])
+            line = line[limit:]
+        if current and size + 1 + len(line) > limit:
+            chunks.append("\n".join(current))
+            current, size = [], 0
+        size += len(line) + (1 if current else 0)
+        current.append(line)
+    if current:
+        chunks.append("\n".join(current))
+    return [chunk for chunk in chunks if chunk.strip()]
+
+
+async def _节流():
+    # 所有群共用同一个发送节奏（风控按账号计算）
+    global _发送锁, _上次发送
+    if _发送锁 is None:
+        _发送锁 = asyncio.Lock()
+    async with _发送锁:
+        loop = asyncio.get_running_loop()
+        wait = _上次发送 + _发送间隔 - loop.time()
+        if wait > 0:
+            await asyncio.sleep(wait)
+        _上次发送 = loop.time()
+
+
+class 群消息队列:
+    """
+    单个群的发送队列
+
+    第一条消息到达后等待一个合并窗口，窗口内到达的消息合并为一次发送；
+    合并后的内容超过 qq_message_forward_threshold 段且不含@时以合并转发发送，
+    否则逐段发送。发送失败会重试，最终失败时记录错误。
+
+    Args:
+        group_id (int): 群号
+    """
+
+    def __init__(self, group_id):
+        self.group_id = int(group_id)
+        self._待发送 = []  # [(bot, message, Future)]
+        self._任务 = None
+
+    def 发送(self, bot, message):
+        """
+        把消息加入队列
+
+        Returns:
+            asyncio.Future: 发送完成后结果为是否成功，调用方可以不等待
+        """
+        future = asyncio.get_running_loop().create_future()
+        self._待发送.append((bot, str(message), future))
+        if self._任务 is None or self._任务.done():
+            self._任务 = asyncio.create_task(self._运行())
+        return future
+
+    async def _运行(self):
+        while self._待发送:
+            await asyncio.sleep(_合并窗口)
+            batch, self._待发送 = self._待发送, []
+            bot = batch[-1][0]
+            text = "\n\n".join(message for _, message, _ in batch)
+            if len(batch) > 1:
+                logger.debug(f"合并 {len(batch)} 条发往群 {self.group_id} 的消息")
+            success = await self._投递(bot, 分段(text))
+            for _, _, future in batch:
+                if not future.done():
+                    future.set_result(success)
+
+    async def _投递(self, bot, chunks):
+        if len(chunks) > _转发阈值 and "[CQ:at" not in "".join(chunks):
+            try:
+                await _节流()
+                await bot.send_group_forward_msg(
+                    group_id=self.group_id,
+                    messages=[
+                        {"type": "node", "data": {"name": "通知", "uin": str(bot.self_id), "content": chunk}}
+                        for chunk in chunks
+                    ],
+                )
+                return True
+            except Exception as e:
+                logger.warning(f"合并转发到群 {self.group_id} 失败，改为逐段发送: {e}")
+
+        for chunk in chunks:
+            for attempt in range(_重试次数 + 1):
+                try:
+                    await _节流()
+                    await bot.send_group_msg(group_id=self.group_id, message=chunk)
+                    break
+                except Exception as e:
+                    error_msg = str(e)
+                    if "不是本群成员" in error_msg or "not in group" in error_msg.lower():
+                        logger.error(f"机器人不在目标群组 {self.group_id} 内，请将机器人QQ号添加到群组中")
+                        return False
+                    if attempt == _重试次数:
+                        logger.error(f"发送消息到群 {self.group_id} 失败: {error_msg}")
+                        return False
+                    logger.warning(f"发送消息到群 {self.group_id} 失败，{2 ** (attempt + 1)} 秒后重试: {error_msg}")
+                    await asyncio.sleep(2 ** (attempt + 1))
+        return True
+
+
+_队列 = {}  # {group_id: 群消息队列}
+
+
+def 发送群消息(bot, group_id, message):
+    """
+    通过发送队列向群发送消息
+
+    Args:
+        bot (Bot): 机器人
+        group_id (int | str): 群号
+        message (str | Message): 消息内容
+
+    Returns:
+        asyncio.Future: 发送完成后结果为是否成功，调用方可以不等待
+    """
+    group_id = int(group_id)
+    queue = _队列.get(group_id)
+    if queue is None:
+        queue = _队列[group_id] = 群消息队列(group_id)
+    return queue.发送(bot, message)
@@ -1,19 +1,21 @@
+import asyncio
 import nonebot
-from nonebot import logger, on_notice, on_command
+from nonebot import logger, on_command
 from nonebot.adapters.onebot.v11 import Bot, GroupIncreaseNoticeEvent
 from nonebot.adapters.onebot.v11.permission import GROUP_ADMIN, GROUP_OWNER
 from nonebot.permission import SUPERUSER
 from nonebot.adapters.onebot.v11 import MessageEvent, Message
 from nonebot.params import CommandArg
 from .user_info import fetch_user_info
+from .消息队列 import 发送群消息
+from .通知路由 import 注册
+from ...utils.日志工具 import 调试, 摘要
 
 # 获取配置
 config = nonebot.get_driver().config
 # 获取用户检测功能开关，默认为 False
 user_check_enabled = getattr(config, "user_check_enabled", False)
 
-# 创建群成员增加事件处理器，指定只处理GroupIncreaseNoticeEvent事件
-group_increase = on_notice(priority=10)
 
 # 创建命令处理器，用于控制用户检测功能开关
 user_check_switch = on_command("用户检测", priority=5, permission=SUPERUSER)
@@ -35,49 +37,115 @@ async def handle_user_check_switch(event: MessageEvent, arg: Message = CommandAr
     else:
         await user_check_switch.finish("用法：\n用户检测 开启/关闭/状态\n例如：用户检测 开启")
 
-@group_increase.handle()
+_最低等级 = 5  # QQ等级小于等于该值时禁言
+_禁言秒数 = 2592000  # 30天
+_批处理窗口 = float(getattr(config, "user_check_batch_window", 2.0))  # 秒
+_突发阈值 = int(getattr(config, "user_check_raid_threshold", 5))  # 一批入群人数达到该值时视为突发入群
+_检测并发数 = int(getattr(config, "user_check_concurrency", 5))
+_禁言间隔 = float(getattr(config, "user_check_ban_interval", 0.5))  # 秒
+
+_待检测 = {}  # {group_id: [user_id]}
+_检测任务 = {}  # {group_id: Task}
+_检测限制 = None
+
+
+# 群成员增加事件由通知路由分发
+@注册("group_increase")
 async def handle_group_increase(bot: Bot, event: GroupIncreaseNoticeEvent):
     # 检查功能是否开启
     if not user_check_enabled:
         return
         
-    # 获取用户QQ号
-    user_id = event.user_id
+    # 入群事件先进入队列，批处理窗口内的入群一起检测
     group_id = event.group_id
-    
+    _待检测.setdefault(group_id, []).append(event.user_id)
+    task = _检测任务.get(group_id)
+    if task is None or task.done():
+        _检测任务[group_id] = asyncio.create_task(_处理入群(bot, group_id))
+
+
+async def _检测成员(user_id):
+    """
+    获取新成员的QQ等级
+
+    Returns:
+        tuple: (user_id, QQ等级或None, 错误信息或None)
+    """
+    global _检测限制
+    if _检测限制 is None:
+        _检测限制 = asyncio.Semaphore(max(1, _检测并发数))
     try:
-        # 调用获取用户信息接口 (实际使用时需替换为真实API)
-        user_info = await fetch_user_info(user_id)  # 使用await调用异步函数
-        logger.debug(f"Fetched User Info: {user_info}")
-        
-        # 检查user_info是否为None
+        async with _检测限制:
+            user_info = await fetch_user_info(user_id)
+        调试("Fetched User Info: {}", 摘要(user_info))
         if user_info is None:
-            await bot.send_group_msg(
-                group_id=group_id,
-                message=f"无法获取新成员 [CQ:at,qq={user_id}] 的信息"
-            )
-            return
-            
-        # 提取QQ等级并转换为整数
-        qq_level = int(user_info.get('QQLevel', '0'))
-        logger.debug(f"User {user_id} QQ Level: {qq_level}")
-        
-        # 判断等级是否小于等于5
-        if qq_level <= 5:
-            # 执行禁言30天（2592000秒）
-            await bot.set_group_ban(
-                group_id=group_id,
-                user_id=user_id,
-                duration=2592000  # 30天秒数
-            )
-            await bot.send_group_msg(
-                group_id=group_id,
-                message=f"新成员 [CQ:at,qq={user_id}] QQ等级({qq_level})≤5，已自动禁言30天"
-            )
+            return user_id, None, None
+        # 提取QQ等级并转换为整数；缺失或无法解析时视为未知，不能按0级禁言
+        try:
+            qq_level = int(user_info.get('QQLevel'))
+        except (TypeError, ValueError):
+            logger.warning(f"新成员 {user_id} 的QQ等级缺失或无法解析: {user_info.get('QQLevel')!r}")
+            return user_id, None, None
+        调试("User {} QQ Level: {}", user_id, qq_level)
+        return user_id, qq_level, None
     except Exception as e:
-        # 异常处理（可选）
         logger.error(f"处理新成员 {user_id} 时出错: {str(e)}")
-        await bot.send_group_msg(
-            group_id=group_id,
-            message=f"处理新成员时发生错误：{str(e)}"
-        )
\ No newline at end of file
+        return user_id, None, str(e)
+
+
+async def _处理入群(bot, group_id):
+    """
+    批量处理入群队列
+
+    并发检测QQ等级，按 user_check_ban_interval 间隔依次禁言；
+    一批入群人数达到 user_check_raid_threshold 时只发送一条汇总消息
+    """
+    while _待检测.get(group_id):
+        await asyncio.sleep(_批处理窗口)
+        batch = list(dict.fromkeys(_待检测.pop(group_id, [])))
+        raid = len(batch) >= _突发阈值
+        if raid:
+            logger.warning(f"群 {group_id} 在 {_批处理窗口} 秒内新增 {len(batch)} 名成员，进入突发入群模式")
+        
+        results = await asyncio.gather(*(_检测成员(user_id) for user_id in batch))
+        
+        banned = []
+        unknown = []
+        errors = []
+        passed = 0
+        messages = []
+        for user_id, qq_level, error in results:
+            if error is not None:
+                errors.append(user_id)
+                messages.append(f"处理新成员时发生错误：{error}")
+            elif qq_level is None:
+                unknown.append(user_id)
+                messages.append(f"无法获取新成员 [CQ:at,qq={user_id}] 的信息")
+            elif qq_level <= _最低等级:
+                try:
+                    # 执行禁言30天
+                    await bot.set_group_ban(group_id=group_id, user_id=user_id, duration=_禁言秒数)
+                    banned.append(user_id)
+                    messages.append(f"新成员 [CQ:at,qq={user_id}] QQ等级({qq_level})≤{_最低等级}，已自动禁言30天")
+                except Exception as e:
+                    logger.error(f"禁言新成员 {user_id} 失败: {str(e)}")
+                    errors.append(user_id)
+                    messages.append(f"处理新成员时发生错误：{str(e)}")
+                # 连续禁言之间保持间隔，避免触发风控
+                await asyncio.sleep(_禁言间隔)
+            else:
+                passed += 1
+        
+        if raid:
+            lines = [f"🚨 检测到 {len(batch)} 名新成员集中入群，已完成检测："]
+            lines.append(f"已禁言 {len(banned)} 人（QQ等级≤{_最低等级}），通过 {passed} 人")
+            if unknown:
+                lines.append(f"无法获取信息 {len(unknown)} 人")
+            if errors:
+                lines.append(f"处理出错 {len(errors)} 人，请查看日志")
+            if banned:
+                lines.append("已禁言：" + "、".join(str(user_id) for user_id in banned))
+            发送群消息(bot, group_id, "\n".join(lines))
+        else:
+            for message in messages:
+                发送群消息(bot, group_id, message)
@@ -0,0 +1,158 @@
+"""
+群成员名单模块
+一次 get_group_member_list 载入整个群的成员，之后由入群/退群通知增量维护并定期全量校准，
+“某QQ号是否在群内”只是一次集合查找
+"""
+
+import asyncio
+from typing import Union
+
+import nonebot
+from nonebot import logger, require
+from nonebot_plugin_apscheduler import scheduler
+from nonebot.adapters.onebot.v11 import GroupDecreaseNoticeEvent, GroupIncreaseNoticeEvent
+
+from .通知路由 import 注册
+
+require("nonebot_plugin_apscheduler")
+
+config = nonebot.get_driver().config
+
+
+class 群成员名单:
+    """
+    单个群的成员名单
+
+    并发的首次载入只会请求一次；载入期间收到的入群/退群通知会在载入完成后重放，
+    不会被旧的成员列表覆盖。
+
+    Args:
+        group_id (int): 群号
+    """
+
+    def __init__(self, group_id):
+        self.group_id = int(group_id)
+        self._成员 = None  # set[int]
+        self._变更 = None  # 载入期间收到的 (user_id, 是否在群)
+        self._lock = None
+
+    @property
+    def 已加载(self):
+        return self._成员 is not None
+
+    async def 载入(self, bot, force=False):
+        """
+        从OneBot获取完整的群成员列表
+
+        Args:
+            bot (Bot): 用于调用接口的机器人
+            force (bool): 已加载时是否重新获取
+        """
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        async with self._lock:
+            if self.已加载 and not force:
+                return
+            self._变更 = []
+            try:
+                members = await bot.get_group_member_list(group_id=self.group_id)
+                result = {int(member["user_id"]) for member in members}
+                for user_id, joined in self._变更:
+                    if joined:
+                        result.add(user_id)
+                    else:
+                        result.discard(user_id)
+                self._成员 = result
+            finally:
+                self._变更 = None
+            logger.info(f"群 {self.group_id} 成员名单已载入，共 {len(self._成员)} 人")
+
+    def 更新(self, user_id, joined):
+        """
+        根据入群/退群通知更新名单
+
+        Args:
+            user_id (int): 成员QQ号
+            joined (bool): True 为入群，False 为退群
+        """
+        user_id = int(user_id)
+        if self._变更 is not None:
+            self._变更.append((user_id, joined))
+        if self._成员 is None:
+            return
+        if joined:
+            self._成员.add(user_id)
+        else:
+            self._成员.discard(user_id)
+
+    async def 包含(self, bot, user_id):
+        """
+        判断QQ号是否在群内（首次调用时载入名单）
+
+        Returns:
+            bool: 是否在群内
+
+        Raises:
+            Exception: 名单载入失败时抛出
+        """
+        if not self.已加载:
+            await self.载入(bot)
+        return int(user_id) in self._成员
+
+    def __len__(self):
+        return len(self._成员) if self._成员 else 0
+
+
+_名单 = {}  # {group_id: 群成员名单}
+_OneBot并发限制 = None
+
+
+def 获取OneBot并发限制():
+    """
+    获取逐个调用OneBot接口时的并发限制（并发数由配置 qq_onebot_concurrency 决定，默认5）
+
+    Returns:
+        asyncio.Semaphore: 共用的信号量
+    """
+    global _OneBot并发限制
+    if _OneBot并发限制 is None:
+        _OneBot并发限制 = asyncio.Semaphore(max(1, int(getattr(config, "qq_onebot_concurrency", 5))))
+    return _OneBot并发限制
+
+
+def 获取名单(group_id):
+    """获取群的成员名单（每个群一个，按需创建）"""
+    group_id = int(group_id)
+    roster = _名单.get(group_id)
+    if roster is None:
+        roster = _名单[group_id] = 群成员名单(group_id)
+    return roster
+
+
+# 名单先于其他入群/退群处理函数更新
+@注册("group_increase", priority=1)
+@注册("group_decrease", priority=1)
+async def _更新名单(bot, event: Union[GroupIncreaseNoticeEvent, GroupDecreaseNoticeEvent]):
+    roster = _名单.get(int(event.group_id))
+    if roster is not None:
+        roster.更新(event.user_id, isinstance(event, GroupIncreaseNoticeEvent))
+
+
+@scheduler.scheduled_job(
+    "interval",
+    minutes=int(getattr(config, "qq_roster_resync_minutes", 30)),
+    id="qq_roster_resync",
+)
+async def 定时校准名单():
+    """定期全量重新获取已载入的名单，修正遗漏的通知"""
+    bots = nonebot.get_bots()
+    if not bots or not _名单:
+        return
+    bot = next(iter(bots.values()))
+    for roster in list(_名单.values()):
+        if not roster.已加载:
+            continue
+        try:
+            await roster.载入(bot, force=True)
+        except Exception as e:
+            logger.warning(f"校准群 {roster.group_id} 成员名单失败，继续使用现有名单: {e}")
@@ -1,16 +1,19 @@
 import nonebot
-from nonebot import logger, on_notice
+from nonebot import logger
 from nonebot.adapters.onebot.v11 import Bot, GroupDecreaseNoticeEvent
 from ..feishu.查询用户 import 查询用户
-from ..mcsm.command import 面板管理
+from ..mcsm.command import 结果_错误, 结果_不存在, 结果_未确认
+from ..mcsm.调度 import 广播白名单, 汇总白名单结果
+from ...utils.日志工具 import 调试, 摘要
+from .消息队列 import 发送群消息
+from .群成员 import 获取名单
+from .通知路由 import 注册
 
 config = nonebot.get_driver().config
 group_id = getattr(config, "qq_group_id", None)  # 获取配置中的QQ群号
 
-# 创建退群事件监听器
-group_decrease = on_notice(priority=10)
-
-@group_decrease.handle()
+# 退群事件由通知路由分发
+@注册("group_decrease")
 async def handle_group_decrease(bot: Bot, event: GroupDecreaseNoticeEvent):
     """
     处理群成员减少事件（退群/被踢）
@@ -31,77 +34,111 @@ async def handle_group_decrease(bot: Bot, event: GroupDecreaseNoticeEvent):
 async def process_whitelist_removal(bot: Bot, user_id: int):
     """
     处理白名单删除的核心逻辑
+    
+    删除该QQ号名下的全部游戏ID（同一QQ号可能提交过多条记录）；
+    游戏ID同时被仍在群内的其他QQ号使用时保留，不删除
     """
     try:
         logger.info(f"开始查询退群用户 {user_id} 的白名单信息")
         query = 查询用户()
-        # 使用新的根据QQ号精确查询的方法
-        result = await query.根据QQ号查询用户(str(user_id))
-        
-        logger.debug(f"获取用户信息结果: {result}")
+        # 优先读取内存中的 QQ → 游戏ID 索引，无需网络请求
+        game_ids = await query.根据QQ号查询游戏ID(str(user_id))
         
-        if result and result.get("code") == 0:
-            items = result.get("data", {}).get("items", [])
-            logger.info(f"从飞书表格查询到 {len(items)} 条用户记录")
+        if game_ids is None:
+            logger.warning(f"获取飞书表格数据失败，无法处理退群用户 {user_id}")
+            if group_id:
+                发送群消息(bot, group_id, f"❌ 获取白名单数据失败，无法处理退群用户 {user_id} 的白名单删除")
+            return
+            
+        if not game_ids:
+            logger.info(f"退群用户 {user_id} 未在白名单申请记录中找到")
+            if group_id:
+                发送群消息(bot, group_id, f"ℹ️ 检测到用户 {user_id} 退群，该用户未在白名单申请记录中")
+            return
+            
+        kept = await _仍被使用的游戏ID(bot, query, user_id, game_ids)
+        if kept:
+            logger.info(f"用户 {user_id} 的游戏ID仍被群内其他用户使用，保留白名单: {kept}")
+            game_ids = [game_id for game_id in game_ids if game_id not in kept]
+            if group_id:
+                notes = "，".join(f"{game_id}（QQ {', '.join(owners)}）" for game_id, owners in kept.items())
+                发送群消息(bot, group_id, f"ℹ️ 检测到用户 {user_id} 退群，以下游戏ID仍被群内其他用户使用，已保留白名单：{notes}")
+            if not game_ids:
+                return
+            
+        logger.info(f"准备删除用户 {user_id} 的白名单，游戏ID: {game_ids}")
+        try:
+            # 删除白名单（白名单镜像确认不在白名单中时不会发送命令）
+            results = 汇总白名单结果(game_ids, await 广播白名单("remove", game_ids))
+            调试("删除操作返回结果: {}", 摘要(results))
+        except Exception as e:
+            error_msg = str(e)
+            logger.error(f"删除白名单失败: {error_msg}", exc_info=True)
             
-            if items:
-                # 获取第一个匹配的用户记录（正常情况下一个QQ号只会有一条记录）
-                target_item = items[0]
-                fields = target_item.get("fields", {})
-                game_id = fields.get("游戏ID", [{}])[0].get("text", "")
-                
-                if game_id:
-                    logger.info(f"准备删除用户 {user_id} 的白名单，游戏ID: {game_id}")
-                    
-                    try:
-                        # 删除白名单
-                        manager = 面板管理(f"multilogin whitelist remove {game_id}")
-                        result = manager.发送并获取日志()
-                        
-                        logger.info(f"成功删除用户 {user_id} 的白名单，游戏ID: {game_id}")
-                        logger.debug(f"删除操作返回结果: {result}")
-                        
-                        # 发送通知消息到群
-                        if group_id:
-                            await bot.send_group_msg(
-                                group_id=int(group_id),
-                                message=f"✅ 检测到用户 {user_id} 退群，已自动删除其白名单 (游戏ID: {game_id})"
-                            )
-                    except Exception as e:
-                        error_msg = str(e)
-                        logger.error(f"删除白名单失败: {error_msg}", exc_info=True)
-                        
-                        # 发送错误消息到群
-                        if group_id:
-                            await bot.send_group_msg(
-                                group_id=int(group_id),
-                                message=f"❌ 删除退群用户 {user_id} 的白名单时出错: {error_msg}"
-                            )
-                else:
-                    logger.warning(f"用户 {user_id} 的游戏ID为空，无法删除白名单")
-                    if group_id:
-                        await bot.send_group_msg(
-                            group_id=int(group_id),
-                            message=f"⚠️ 检测到用户 {user_id} 退群，但未找到其游戏ID，无法删除白名单"
-                        )
-            else:
-                logger.info(f"退群用户 {user_id} 未在白名单申请记录中找到")
-                if group_id:
-                    await bot.send_group_msg(
-                        group_id=int(group_id),
-                        message=f"ℹ️ 检测到用户 {user_id} 退群，该用户未在白名单申请记录中"
-                    )
-        else:
-            logger.warning(f"获取飞书表格数据失败或无数据返回，结果: {result}")
+            # 发送错误消息到群
             if group_id:
-                await bot.send_group_msg(
-                    group_id=int(group_id),
-                    message=f"❌ 获取白名单数据失败，无法处理退群用户 {user_id} 的白名单删除"
-                )
+                发送群消息(bot, group_id, f"❌ 删除退群用户 {user_id} 的白名单时出错: {error_msg}")
+            return
+            
+        removed = [game_id for game_id in game_ids if results[game_id]["状态"] not in (结果_错误, 结果_不存在, 结果_未确认)]
+        absent = [game_id for game_id in game_ids if results[game_id]["状态"] == 结果_不存在]
+        unconfirmed = [game_id for game_id in game_ids if results[game_id]["状态"] == 结果_未确认]
+        failed = [game_id for game_id in game_ids if results[game_id]["状态"] == 结果_错误]
+        
+        lines = []
+        if removed:
+            logger.info(f"成功删除用户 {user_id} 的白名单，游戏ID: {removed}")
+            lines.append(f"✅ 检测到用户 {user_id} 退群，已自动删除其白名单 (游戏ID: {', '.join(removed)})")
+        if absent:
+            logger.info(f"用户 {user_id} 的游戏ID {absent} 不在服务器白名单中，无需删除")
+            lines.append(f"ℹ️ 检测到用户 {user_id} 退群，其游戏ID {', '.join(absent)} 不在服务器白名单中，无需删除")
+        if unconfirmed:
+            logger.warning(f"用户 {user_id} 的游戏ID {unconfirmed} 的删除结果未在日志中确认")
+            lines.append(f"⚠️ 检测到用户 {user_id} 退群，已发送删除命令但未能确认结果 (游戏ID: {', '.join(unconfirmed)})，请手动检查")
+        for game_id in failed:
+            error_msg = "\n".join(results[game_id]["日志"]) or "删除白名单命令执行出错"
+            logger.error(f"删除白名单失败，游戏ID: {game_id}, 错误: {error_msg}")
+            lines.append(f"❌ 删除退群用户 {user_id} 的白名单时出错 (游戏ID: {game_id}): {error_msg}")
+            
+        # 发送通知消息到群
+        if group_id and lines:
+            发送群消息(bot, group_id, "\n".join(lines))
     except Exception as e:
         logger.error(f"处理退群用户 {user_id} 的白名单删除时出错: {str(e)}", exc_info=True)
         if group_id:
-            await bot.send_group_msg(
-                group_id=int(group_id),
-                message=f"❌ 处理退群用户 {user_id} 的白名单删除时发生错误，请查看日志"
-            )
\ No newline at end of file
+            发送群消息(bot, group_id, f"❌ 处理退群用户 {user_id} 的白名单删除时发生错误，请查看日志")
+
+
+async def _仍被使用的游戏ID(bot, query, user_id, game_ids):
+    """
+    找出同时被仍在群内的其他QQ号使用的游戏ID
+
+    Returns:
+        dict: {游戏ID: 仍在群内的其他QQ号列表}
+    """
+    owners_by_id = await query.根据游戏ID查询QQ号(game_ids)
+    if owners_by_id is None:
+        # 无法确认时按原逻辑删除，避免退群用户保留白名单
+        logger.warning(f"无法查询游戏ID {game_ids} 的其他使用者，按原逻辑删除")
+        return {}
+    others = {
+        game_id: [qq for qq in owners if qq != str(user_id)]
+        for game_id, owners in owners_by_id.items()
+    }
+    if not any(others.values()):
+        return {}
+    roster = 获取名单(group_id)
+    kept = {}
+    for game_id, qqs in others.items():
+        in_group = []
+        for qq in qqs:
+            try:
+                if await roster.包含(bot, qq):
+                    in_group.append(qq)
+            except Exception as e:
+                # 名单不可用时保守处理：视为仍在群内，不删除
+                logger.warning(f"检查QQ {qq} 是否在群内失败，保留游戏ID {game_id}: {e}")
+                in_group.append(qq)
+        if in_group:
+            kept[game_id] = in_group
+    return kept
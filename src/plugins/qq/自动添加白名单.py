@@ -1,11 +1,17 @@
+import asyncio
 import nonebot
 from nonebot import logger, require, on_command
 from nonebot_plugin_apscheduler import scheduler
 from nonebot.permission import SUPERUSER
 from nonebot.adapters.onebot.v11 import Bot
 from ..feishu.查询用户 import 查询用户
-from ..mcsm.command import 面板管理
-from .filters import apply_filters, extract_user_info
+from ..mcsm.command import 结果_错误, 结果_未确认
+from ..mcsm.调度 import 广播白名单, 汇总白名单结果
+from .filters import 过滤引擎, 过滤规则, 默认规则
+from .处理记录 import 处理记录, 结果_已添加, 结果_失败
+from .群成员 import 获取名单, 获取OneBot并发限制
+from .消息队列 import 发送群消息
+from ...utils.日志工具 import 调试, 信息, 摘要
 
 require("nonebot_plugin_apscheduler")
 
@@ -18,16 +24,11 @@ add_whitelist = on_command("add_whitelist", aliases={"添加白名单", "添加
 async def send_message_to_group(bot, message):
     """
     向群组发送消息的通用函数
+    
+    消息进入发送队列后立即返回，由队列负责合并、分段、限速和失败重试
     """
-    try:
-        if group_id:
-            await bot.send_group_msg(group_id=int(group_id), message=message)
-    except Exception as e:
-        error_msg = str(e)
-        logger.error(f"发送消息失败: {error_msg}", exc_info=True)
-        # 检查是否是因为机器人不在群内
-        if "不是本群成员" in error_msg or "not in group" in error_msg.lower():
-            logger.error(f"机器人不在目标群组 {group_id} 内，请将机器人QQ号添加到群组中")
+    if group_id:
+        发送群消息(bot, group_id, message)
 
 # @scheduler.scheduled_job("cron", hour=10, minute=0, id="auto_add_whitelist")
 async def auto_add_whitelist():
@@ -63,130 +64,189 @@ async def handle_add_whitelist_command(bot: Bot):
         return
     await process_whitelist_addition(bot)
 
+def _记录拒绝(record, reason):
+    # 已处理的记录保持原有结果，不改写为拒绝
+    if reason != "已处理":
+        处理记录.拒绝(record, reason)
+
+
+# 已处理完毕的记录在所有规则之前跳过
+_添加规则 = (过滤规则("已处理", lambda record: not 处理记录.已处理(record)),) + 默认规则
+
+
+async def _检查成员(bot, roster, qq):
+    """检查用户是否在群内，不在群内或查询失败时抛出异常"""
+    if not group_id or not qq.strip():
+        return
+    if roster is not None:
+        if not await roster.包含(bot, qq):
+            raise Exception("群成员名单中没有该用户")
+        return
+    async with 获取OneBot并发限制():
+        group_member_info = await bot.get_group_member_info(
+            group_id=int(group_id),
+            user_id=int(qq),
+            no_cache=True
+        )
+    调试("用户 {} 在群 {} 内，信息: {}", qq, group_id, 摘要(group_member_info), every=20)
+
+
 async def process_whitelist_addition(bot):
     """
     处理白名单添加的核心逻辑
+    
+    每条申请记录的处理结果会持久化，重复执行时只处理新的或上次失败的记录
     """
     try:
         logger.info("开始处理白名单添加逻辑")
+        await 处理记录.载入()
         query = 查询用户()
         logger.debug("初始化查询昨天的用户实例完成")
-        result = await query.获取昨日提交用户()
-        logger.info(f"获取用户信息结果: {result}")
-        logger.debug(f"获取用户信息结果详情: {type(result)}, {len(result) if isinstance(result, dict) else 'N/A'}")
-        if result and result.get("code") == 0:
-            items = result.get("data", {}).get("items", [])
-            logger.info(f"获取到 {len(items)} 个用户提交记录")
-            logger.debug(f"原始用户数据详情: {items}")
-            if not items:
-                logger.info("没有查询到任何提交记录")
-                await send_message_to_group(bot, "📭 昨日没有查询到任何提交记录。")
+        engine = 过滤引擎(_添加规则, 拒绝回调=_记录拒绝)
+        async for page in query.逐页获取昨日提交用户():
+            # 逐页输入过滤引擎，内存中只保留每个游戏ID最新的一条记录
+            engine.输入(page)
+        total_count = engine.总数
+        logger.info(f"获取到 {total_count} 个用户提交记录")
+        if not total_count:
+            logger.info("没有查询到任何提交记录")
+            await send_message_to_group(bot, "📭 昨日没有查询到任何提交记录。")
+        else:
+            # QQ号去重需要在全部页面到达后执行
+            valid_items = engine.结果()
+            
+            skipped = engine.拒绝计数["已处理"]
+            if skipped:
+                logger.info(f"跳过 {skipped} 条已处理的记录")
+            
+            if not valid_items and skipped:
+                logger.info("没有新的待处理记录")
+                await send_message_to_group(bot, f"📭 昨日的 {skipped} 条申请记录均已处理，没有新的记录。")
+            elif not valid_items:
+                logger.info("没有查询到任何有效记录")
+                await send_message_to_group(bot, "📭 昨日没有查询到任何有效记录。")
             else:
-                # 应用所有过滤器
-                valid_items = apply_filters(items)
+                lines = ["📋 昨日提交白名单申请的用户如下：", ""]
+                for idx, record in enumerate(valid_items, start=1):
+                    score = record.score if record.score is not None else "未知"
+                    lines.append(f"{idx}. QQ：{record.qq} | 游戏ID：{record.game_id} | 总分：{score}")
+                # 过长时由发送队列按行拆分
+                response_text = "\n".join(lines)
+                信息("用户详情: {}", 摘要(valid_items))
+                await send_message_to_group(bot, response_text)
+                
+                # 循环检查用户是否在群内，收集待添加的游戏ID
+                logger.info("开始检查待添加白名单的用户")
+                success_count = 0
+                fail_count = 0
+                success_users = []
+                fail_users = []
+                pending_users = []
+                
+                # 一次获取整个群的成员名单，之后逐个用户只是集合查找；获取失败时退回逐个查询
+                roster = None
+                if group_id:
+                    try:
+                        roster = 获取名单(group_id)
+                        await roster.载入(bot)
+                    except Exception as e:
+                        logger.warning(f"获取群 {group_id} 成员名单失败，改为逐个查询成员信息: {str(e)}")
+                        roster = None
                 
-                if not valid_items:
-                    logger.info("没有查询到任何有效记录")
-                    await send_message_to_group(bot, "📭 昨日没有查询到任何有效记录。")
-                else:
-                    response_text = "📋 昨日提交白名单申请的用户如下：\n\n"
-                    user_details = []
-                    for idx, item in enumerate(valid_items, start=1):
-                        user_info = extract_user_info(item)
-                        if user_info:
-                            response_text += (
-                                f"{idx}. QQ：{user_info['qq']} | 游戏ID：{user_info['game_id']} | 总分：{user_info['score']}\n"
-                            )
-                            user_details.append({
-                                "index": idx,
-                                **user_info
-                            })
-                    logger.info(f"用户详情: {user_details}")
-                    await send_message_to_group(bot, response_text)
+                # 并发检查全部用户（逐个查询时受 qq_onebot_concurrency 限制），结果按原顺序处理
+                membership = await asyncio.gather(
+                    *(_检查成员(bot, roster, record.qq) for record in valid_items),
+                    return_exceptions=True,
+                )
+                
+                for idx, record in enumerate(valid_items):
+                    qq = record.qq
+                    game_id = record.game_id
+                    user = {"qq": qq, "game_id": game_id, "record": record}
+                    调试("正在处理第 {} 个用户 QQ:{}, GameID:{}", idx + 1, qq, game_id, every=20)
                     
-                    # 循环添加用户白名单
-                    logger.info("开始循环添加用户白名单")
-                    success_count = 0
-                    fail_count = 0
-                    success_users = []
-                    fail_users = []
+                    # 数据校验，跳过空数据
+                    if not qq.strip() or not game_id.strip():
+                        logger.warning(f"发现空数据，QQ: '{qq}', GameID: '{game_id}'，跳过该条记录")
+                        continue
                     
-                    for idx, item in enumerate(valid_items):
-                        logger.debug(f"开始处理第 {idx+1} 个有效用户")
-                        user_info = extract_user_info(item)
-                        if not user_info:
-                            logger.warning(f"无法提取第 {idx+1} 个用户的信息")
-                            continue
-                            
-                        qq = user_info['qq']
-                        game_id = user_info['game_id']
-                        logger.info(f"正在处理用户 QQ:{qq}, GameID:{game_id}")
-                        
-                        # 数据校验，跳过空数据
-                        if not qq.strip() or not game_id.strip():
-                            logger.warning(f"发现空数据，QQ: '{qq}', GameID: '{game_id}'，跳过该条记录")
+                    # 检查用户是否在群内
+                    if group_id and qq:
+                        error = membership[idx]
+                        if isinstance(error, Exception):
+                            logger.warning(f"用户 {qq} 不在群 {group_id} 内或获取信息失败: {str(error)}")
+                            logger.opt(exception=error).debug("详细错误信息")
+                            # 用户不在群内，跳过添加白名单
+                            fail_count += 1
+                            fail_users.append({**user, "error": "用户不在群内"})
+                            # 用户之后可能入群，记为失败，下次执行时重试
+                            处理记录.标记(record, 结果_失败, "用户不在群内")
                             continue
-                        
-                        # 检查用户是否在群内
-                        if group_id and qq:
-                            try:
-                                logger.debug(f"准备检查用户 {qq} 是否在群 {group_id} 内")
-                                group_member_info = await bot.get_group_member_info(
-                                    group_id=int(group_id),
-                                    user_id=int(qq),
-                                    no_cache=True
-                                )
-                                logger.info(f"用户 {qq} 在群 {group_id} 内，信息: {group_member_info}")
-                                logger.debug(f"用户 {qq} 的群成员信息详情: {group_member_info}")
-                            except Exception as e:
-                                logger.warning(f"用户 {qq} 不在群 {group_id} 内或获取信息失败: {str(e)}")
-                                logger.debug("详细错误信息", exc_info=True)
-                                # 用户不在群内，跳过添加白名单
+                    
+                    if game_id:
+                        pending_users.append(user)
+                    else:
+                        logger.warning(f"用户 QQ:{qq} 的游戏ID为空，跳过添加白名单")
+                        fail_count += 1
+                        fail_users.append({"qq": qq, "game_id": "空", "error": "游戏ID为空"})
+                
+                # 批量发送白名单命令，一次日志查询得到每个游戏ID的结果
+                if pending_users:
+                    try:
+                        logger.info(f"准备批量添加 {len(pending_users)} 个白名单")
+                        pending_ids = [user["game_id"] for user in pending_users]
+                        batch_results = 汇总白名单结果(pending_ids, await 广播白名单("add", pending_ids))
+                        for user in pending_users:
+                            batch_result = batch_results.get(user["game_id"], {})
+                            status = batch_result.get("状态")
+                            调试("游戏ID {} 白名单结果: {}, 日志: {}", user["game_id"], status, 摘要(batch_result.get("日志")), every=20)
+                            if status == 结果_错误:
+                                logger.error(f"添加白名单失败，QQ: {user['qq']}, 游戏ID: {user['game_id']}, 日志: {batch_result.get('日志')}")
                                 fail_count += 1
-                                fail_users.append({"qq": qq, "game_id": game_id, "error": "用户不在群内"})
-                                continue
-                        
-                        if game_id:
-                            try:
-                                logger.debug(f"准备为游戏ID {game_id} 添加白名单")
-                                manager = 面板管理(f"multilogin whitelist add {game_id}")
-                                result = manager.发送并获取日志()
-                                logger.info(f"添加白名单成功，游戏ID: {game_id}, 返回结果: {result}")
-                                logger.debug(f"添加白名单详细结果: {result}")
+                                fail_users.append({**user, "error": "\n".join(batch_result.get("日志", []))})
+                                处理记录.标记(user["record"], 结果_失败, "\n".join(batch_result.get("日志", [])))
+                            else:
+                                调试("添加白名单成功，游戏ID: {}, 结果: {}", user["game_id"], status, every=20)
                                 success_count += 1
-                                success_users.append({"qq": qq, "game_id": game_id})
-                            except Exception as e:
-                                logger.error(f"添加白名单失败，QQ: {qq}, 游戏ID: {game_id}, 错误: {str(e)}")
-                                logger.debug("详细错误信息", exc_info=True)
-                                fail_count += 1
-                                fail_users.append({"qq": qq, "game_id": game_id, "error": str(e)})
-                        else:
-                            logger.warning(f"用户 QQ:{qq} 的游戏ID为空，跳过添加白名单")
+                                success_users.append(user)
+                                if status == 结果_未确认 or not status:
+                                    # 超时前没有日志确认该游戏ID，命令可能丢失，记为失败以便下次重试
+                                    处理记录.标记(user["record"], 结果_失败, "未在日志中确认添加结果")
+                                else:
+                                    处理记录.标记(user["record"], 结果_已添加, status)
+                    except Exception as e:
+                        logger.error(f"批量添加白名单失败，错误: {str(e)}")
+                        logger.debug("详细错误信息", exc_info=True)
+                        for user in pending_users:
                             fail_count += 1
-                            fail_users.append({"qq": qq, "game_id": "空", "error": "游戏ID为空"})
-                    
-                    # 发送添加结果
-                    result_message = f"✅ 白名单添加完成！成功: {success_count}个，失败: {fail_count}个"
-                    logger.info(f"白名单添加完成统计 - 成功: {success_count}, 失败: {fail_count}")
-                    logger.debug(f"成功用户列表: {success_users}")
-                    logger.debug(f"失败用户列表: {fail_users}")
-                    
-                    # 只发送成功添加白名单的用户信息
-                    if success_users:
-                        
-                        # 艾特成功的用户
-                        at_message = "🎉 恭喜以下用户白名单添加成功：\n"
-                        for user in success_users:
-                            at_message += f"[CQ:at,qq={user['qq']}]\n"
-                        at_message += "\n请检查游戏内是否已成功添加白名单"
-                        await send_message_to_group(bot, at_message)
+                            fail_users.append({**user, "error": str(e)})
+                            处理记录.标记(user["record"], 结果_失败, str(e))
+                
+                # 发送添加结果
+                result_message = f"✅ 白名单添加完成！成功: {success_count}个，失败: {fail_count}个"
+                logger.info(f"白名单添加完成统计 - 成功: {success_count}, 失败: {fail_count}")
+                调试("成功用户列表: {}", 摘要(success_users))
+                调试("失败用户列表: {}", 摘要(fail_users))
+                
+                # 只发送成功添加白名单的用户信息
+                if success_users:
                     
-                    await send_message_to_group(bot, result_message)
-        else:
-            logger.warning(f"获取用户信息失败或无数据返回，结果: {result}")
-            logger.debug(f"获取用户信息失败详情: code={result.get('code') if isinstance(result, dict) else 'N/A'}")
-            await send_message_to_group(bot, "❌ 获取用户信息失败或无数据返回。")
+                    # 艾特成功的用户
+                    at_lines = ["🎉 恭喜以下用户白名单添加成功："]
+                    at_lines.extend(f"[CQ:at,qq={user['qq']}]" for user in success_users)
+                    at_lines.extend(["", "请检查游戏内是否已成功添加白名单"])
+                    at_message = "\n".join(at_lines)
+                    await send_message_to_group(bot, at_message)
+                
+                await send_message_to_group(bot, result_message)
     except Exception as e:
         # 异常处理（可选）
         logger.error(f"处理新成员时出错: {str(e)}", exc_info=True)
-        await send_message_to_group(bot, "处理新成员时发生错误：请尽快返回控制台查看")
\ No newline at end of file
+        await send_message_to_group(bot, "处理新成员时发生错误：请尽快返回控制台查看")
+    finally:
+        try:
+            saved = await 处理记录.保存()
+            if saved:
+                logger.info(f"已保存 {saved} 条申请处理记录")
+        except Exception as e:
+            logger.error(f"保存申请处理记录失败: {str(e)}")
\ No newline at end of file
@@ -0,0 +1,76 @@
+"""
+通知事件路由模块
+所有通知事件只经过一个匹配器，按 notice_type / sub_type 查表分发给注册的处理函数，
+不关心的通知在规则检查阶段就被丢弃
+"""
+
+from itertools import count
+
+from nonebot import get_driver, logger, on_notice
+from nonebot.adapters.onebot.v11 import Bot, NoticeEvent
+
+_注册表 = {}  # {(notice_type, sub_type): [(priority, 注册序号, handler)]}
+_注册序号 = count()
+_路由表 = {}  # 启动时由 _注册表 生成：{(notice_type, sub_type): (handler, ...)}
+_关注类型 = frozenset()  # 启动时生成：有处理函数的 notice_type
+
+
+def 注册(notice_type, sub_type=None, priority=10):
+    """
+    注册通知处理函数
+
+    处理函数签名为 async def handler(bot, event)。同一事件的多个处理函数按 priority
+    从小到大依次执行，某个处理函数出错不影响其他处理函数。
+
+    Args:
+        notice_type (str): 通知类型，如 group_increase
+        sub_type (str, optional): 子类型，不传时匹配该通知类型的全部子类型
+        priority (int): 执行顺序，越小越先执行
+    """
+    def decorator(handler):
+        _注册表.setdefault((notice_type, sub_type), []).append((priority, next(_注册序号), handler))
+        return handler
+    return decorator
+
+
+def _生成路由表():
+    global _路由表, _关注类型
+    # 具体子类型的条目预先合并同类型的通配处理函数，分发时只需一次字典查找
+    routes = {}
+    for notice_type, sub_type in _注册表:
+        entries = list(_注册表.get((notice_type, None), []))
+        if sub_type is not None:
+            entries += _注册表[(notice_type, sub_type)]
+        routes[(notice_type, sub_type)] = tuple(
+            handler for _, _, handler in sorted(entries, key=lambda entry: entry[:2])
+        )
+    _路由表 = routes
+    _关注类型 = frozenset(notice_type for notice_type, _ in routes)
+    logger.debug(f"通知路由表已生成: {list(routes)}")
+
+
+def _查找处理函数(event):
+    notice_type = event.notice_type
+    handlers = _路由表.get((notice_type, getattr(event, "sub_type", None)))
+    if handlers is None:
+        handlers = _路由表.get((notice_type, None), ())
+    return handlers
+
+
+async def _有处理函数(event: NoticeEvent) -> bool:
+    return event.notice_type in _关注类型
+
+
+notice_router = on_notice(rule=_有处理函数, priority=1, block=False)
+
+
+@notice_router.handle()
+async def _分发(bot: Bot, event: NoticeEvent):
+    for handler in _查找处理函数(event):
+        try:
+            await handler(bot, event)
+        except Exception as e:
+            logger.error(f"处理通知 {event.notice_type} 时出错 ({handler.__name__}): {str(e)}", exc_info=True)
+
+
+get_driver().on_startup(_生成路由表)
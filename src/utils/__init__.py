@@ -0,0 +1,3 @@
+"""
+插件共用的工具模块（日志、缓存、HTTP客户端），不作为插件加载
+"""
@@ -0,0 +1,57 @@
+"""
+HTTP客户端工具模块
+为各插件提供进程内共享的异步HTTP连接池，避免每次请求重新建立连接，进程关闭时统一释放
+"""
+
+import httpx
+import nonebot
+from nonebot import logger
+
+driver = nonebot.get_driver()
+
+_全部客户端 = []
+
+
+class 共享客户端:
+    """
+    按需创建的共享异步HTTP客户端
+
+    首次 获取() 时创建启用keep-alive连接池的 httpx.AsyncClient，
+    客户端被关闭后再次获取会重新创建；进程关闭时自动关闭。
+
+    Args:
+        名称 (str): 日志中显示的客户端名称
+        **options: 传给 httpx.AsyncClient 的参数，
+            未指定 limits 时最多10个连接、保持5个keep-alive连接
+    """
+
+    def __init__(self, 名称, **options):
+        options.setdefault("limits", httpx.Limits(max_connections=10, max_keepalive_connections=5))
+        self.名称 = 名称
+        self._options = options
+        self._client = None
+        _全部客户端.append(self)
+
+    def 获取(self):
+        """
+        获取客户端（首次调用时创建）
+
+        Returns:
+            httpx.AsyncClient: 共享的客户端
+        """
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(**self._options)
+            logger.debug(f"{self.名称}HTTP客户端已创建")
+        return self._client
+
+    async def 关闭(self):
+        if self._client is not None and not self._client.is_closed:
+            await self._client.aclose()
+            logger.debug(f"{self.名称}HTTP客户端已关闭")
+        self._client = None
+
+
+@driver.on_shutdown
+async def _关闭全部客户端():
+    for client in _全部客户端:
+        await client.关闭()
@@ -0,0 +1,54 @@
+"""
+SQLite工具模块
+为各插件的本地存储提供WAL模式的SQLite连接，数据库操作在线程中串行执行，不阻塞事件循环
+"""
+
+import asyncio
+import os
+import sqlite3
+
+
+class SQLite数据库:
+    """
+    按需打开的SQLite数据库
+
+    首次 执行() 时创建所在目录、打开连接（WAL模式，synchronous=NORMAL）并执行建表语句；
+    所有操作通过同一连接在线程中依次执行。关闭后再次执行会重新打开。
+
+    Args:
+        db_file (str): 数据库文件路径
+        schema (str): 建表语句（应使用 IF NOT EXISTS）
+    """
+
+    def __init__(self, db_file, schema):
+        self.db_file = db_file
+        self._schema = schema
+        self._conn = None
+        self._lock = None
+
+    def _connect(self):
+        if self._conn is None:
+            os.makedirs(os.path.dirname(self.db_file), exist_ok=True)
+            conn = sqlite3.connect(self.db_file, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.executescript(self._schema)
+            self._conn = conn
+        return self._conn
+
+    async def 执行(self, func, *args):
+        """
+        在线程中执行 func(conn, *args)，同一数据库的操作串行执行
+
+        Returns:
+            func 的返回值
+        """
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        async with self._lock:
+            return await asyncio.to_thread(func, self._connect(), *args)
+
+    async def 关闭(self):
+        if self._conn is not None:
+            await self.执行(lambda conn: conn.close())
+            self._conn = None
@@ -0,0 +1,84 @@
+"""
+日志工具模块
+为热路径提供延迟格式化、按调用位置采样和限长摘要的日志记录，
+日志级别不输出时不构造任何日志文本
+"""
+
+import sys
+
+import nonebot
+from nonebot import logger
+
+config = nonebot.get_driver().config
+
+_摘要长度 = int(getattr(config, "log_payload_limit", 500))  # 摘要的最大字符数
+_摘要条数 = 3  # 序列摘要中展示的元素个数
+
+_采样计数 = {}  # {(文件名, 行号): 调用次数}
+
+
+class 摘要:
+    """
+    大对象的限长摘要
+
+    只在日志真正输出时才生成文本：序列显示长度和前几个元素，
+    其余对象截断到 log_payload_limit 个字符。
+
+    Args:
+        value: 要记录的对象
+        limit (int): 最大字符数，默认使用配置 log_payload_limit
+    """
+
+    __slots__ = ("value", "limit")
+
+    def __init__(self, value, limit=_摘要长度):
+        self.value = value
+        self.limit = limit
+
+    def __str__(self):
+        value = self.value
+        if isinstance(value, (list, tuple, set, frozenset, dict)):
+            items = list(value.items() if isinstance(value, dict) else value)
+            head = ", ".join(repr(item) for item in items[:_摘要条数])
+            more = f", ...（共 {len(items)} 项）" if len(items) > _摘要条数 else ""
+            text = f"{type(value).__name__}[{len(items)}] {head}{more}"
+        else:
+            text = str(value)
+        if len(text) > self.limit:
+            text = f"{text[:self.limit]}...（已截断，共 {len(text)} 字符）"
+        return text
+
+    __repr__ = __str__
+
+
+def _命中采样(frame, every):
+    key = (frame.f_code.co_filename, frame.f_lineno)
+    count = _采样计数.get(key, 0)
+    _采样计数[key] = count + 1
+    return count % every == 0
+
+
+def _记录(level, message, args, every):
+    # 采样以调用位置为单位，第1次以及之后每 every 次输出一次
+    if every > 1 and not _命中采样(sys._getframe(2), every):
+        return
+    # lazy=True 时参数必须是可调用对象，只有日志会被输出时才会调用
+    args = [arg if callable(arg) else (lambda arg=arg: arg) for arg in args]
+    logger.opt(lazy=True, depth=2).log(level, message, *args)
+
+
+def 调试(message, *args, every=1):
+    """
+    延迟格式化的 DEBUG 日志
+
+    Args:
+        message (str): 使用 {} 占位的日志模板
+        *args: 模板参数，可以是无参函数（只在输出时调用）或 摘要
+        every (int): 同一调用位置每 every 次只输出一次
+    """
+    _记录("DEBUG", message, args, every)
+
+
+def 信息(message, *args, every=1):
+    """延迟格式化的 INFO 日志，参数同 调试"""
+    _记录("INFO", message, args, every)
@@ -0,0 +1,87 @@
+"""
+缓存工具模块
+按键缓存查询结果一段时间，同一个键的并发请求共享同一次查询
+"""
+
+import asyncio
+import time
+from collections import OrderedDict
+
+from nonebot import logger
+
+
+class 结果缓存:
+    """
+    带TTL的查询结果缓存
+
+    缓存命中时直接返回内存中的结果；未命中时同一个键只有一个协程执行查询，
+    其他并发请求等待同一次查询的结果。查询抛出异常时不会写入缓存；
+    查询返回 None（查无结果）时按 negative_ttl 缓存。
+    返回的结果被多个调用方共享，调用方不应修改。
+
+    Args:
+        ttl (float): 缓存秒数，为0时不缓存
+        max_size (int, optional): 最多缓存的键数，超出时淘汰最久未使用的键
+        negative_ttl (float, optional): None 结果的缓存秒数，默认与 ttl 相同
+    """
+
+    def __init__(self, ttl, max_size=None, negative_ttl=None):
+        self.ttl = ttl
+        self.max_size = max_size
+        self.negative_ttl = ttl if negative_ttl is None else negative_ttl
+        self._结果 = OrderedDict()  # {key: (过期时间, 结果)}，按最近使用排序
+        self._进行中 = {}  # {key: Task}
+
+    async def 获取(self, key, 查询):
+        """
+        获取键对应的结果，未命中时调用 查询() 并缓存
+
+        Args:
+            key (hashable): 缓存键
+            查询 (callable): 无参协程函数
+
+        Returns:
+            查询() 的返回值
+        """
+        cached = self._结果.get(key)
+        if cached is not None:
+            expires_at, result = cached
+            if time.monotonic() < expires_at:
+                self._结果.move_to_end(key)
+                logger.debug(f"查询缓存命中: {key}")
+                return result
+            del self._结果[key]
+
+        task = self._进行中.get(key)
+        if task is None:
+            task = asyncio.ensure_future(self._执行(key, 查询))
+            self._进行中[key] = task
+        return await asyncio.shield(task)
+
+    async def _执行(self, key, 查询):
+        try:
+            result = await 查询()
+            ttl = self.negative_ttl if result is None else self.ttl
+            if ttl > 0 and self._进行中.get(key) is asyncio.current_task():
+                self._结果[key] = (time.monotonic() + ttl, result)
+                self._结果.move_to_end(key)
+                if self.max_size is not None and len(self._结果) > self.max_size:
+                    self._结果.popitem(last=False)
+            return result
+        finally:
+            if self._进行中.get(key) is asyncio.current_task():
+                del self._进行中[key]
+
+    def 失效(self, key=None):
+        """
+        使缓存失效
+
+        Args:
+            key (hashable, optional): 要失效的键，同时放弃该键进行中的查询（下次获取重新查询）；
+                不传时清空全部已缓存的结果，进行中的查询不受影响，完成后照常写入缓存
+        """
+        if key is None:
+            self._结果.clear()
+        else:
+            self._结果.pop(key, None)
+            self._进行中.pop(key, None)
@@ -0,0 +1,16 @@
+import nonebot
+
+# 插件模块在导入时读取配置，需要在导入任何插件之前初始化
+nonebot.init(
+    feishu_app_id="test",
+    feishu_app_secret="test",
+    feishu_base_id="base",
+    feishu_table_id="table",
+    mcsm_api_url="http://mcsm.test",
+    mcsm_api_key="test",
+    mcsm_uuid="uuid",
+    mcsm_daemonid="daemon",
+)
+
+# 与 pyproject 中的 plugins 一致，先于插件模块加载定时任务插件
+nonebot.load_plugin("nonebot_plugin_apscheduler")
@@ -0,0 +1,23 @@
+from src.plugins.feishu.记录 import 申请记录
+from src.plugins.qq.处理记录 import 处理记录库, 结果_已添加, 结果_失败
+
+
+def _记录(record_id, qq="10001", game_id="Abc"):
+    return 申请记录(record_id, qq, game_id, 80, 0, 0)
+
+
+async def test_保存后重新载入(tmp_path):
+    db_file = str(tmp_path / "data" / "processed.db")
+    store = 处理记录库(db_file)
+    store.标记(_记录("rec1"), 结果_已添加)
+    store.标记(_记录("rec2"), 结果_失败, "超时")
+    assert await store.保存() == 2
+    await store.关闭()
+
+    reopened = 处理记录库(db_file)
+    await reopened.载入()
+    assert reopened.已处理(_记录("rec1"))
+    assert not reopened.已处理(_记录("rec2"))
+    # 游戏ID在飞书中被修改后重新处理
+    assert not reopened.已处理(_记录("rec1", game_id="Def"))
+    await reopened.关闭()
@@ -0,0 +1,89 @@
+from datetime import datetime
+
+from src.plugins.mcsm.日志引擎 import 日志游标
+
+# 2026-10-18 12:00:30 本地时间的毫秒时间戳
+_现在 = int(datetime(2026, 10, 18, 12, 0, 30).timestamp() * 1000)
+
+
+def _输出(*lines):
+    return "".join(f"{line}\n" for line in lines)
+
+
+def _内容(cursor):
+    return [line.内容 for line in cursor.缓存]
+
+
+def test_重复输出只追加锚点之后的新行():
+    cursor = 日志游标()
+    # 同一秒内同一命令执行两次，输出完全相同且超过锚点长度
+    block = _输出(*(f"[12:00:00 INFO]: There are 0 of 20 players online: {i:0>40}" for i in range(5)))
+    assert cursor.解析(block + block, _现在)
+    assert cursor.解析(block + block + _输出("[12:00:01 INFO]: done"), _现在)
+    assert _内容(cursor).count("[12:00:01 INFO]: done") == 1
+    assert len(cursor.缓存) == 11
+
+
+def test_锚点之后只追加新行():
+    cursor = 日志游标()
+    assert cursor.解析(_输出("[12:00:00 INFO]: a", "[12:00:01 INFO]: b"), _现在)
+    assert cursor.解析(_输出("[12:00:00 INFO]: a", "[12:00:01 INFO]: b", "[12:00:02 INFO]: c"), _现在)
+    assert _内容(cursor) == ["[12:00:00 INFO]: a", "[12:00:01 INFO]: b", "[12:00:02 INFO]: c"]
+
+
+def test_未完成的最后一行留到下次():
+    cursor = 日志游标()
+    assert cursor.解析("[12:00:00 INFO]: a\n[12:00:01 INFO]: b", _现在)
+    assert _内容(cursor) == ["[12:00:00 INFO]: a"]
+    assert cursor.解析("[12:00:00 INFO]: a\n[12:00:01 INFO]: b\n", _现在)
+    assert _内容(cursor) == ["[12:00:00 INFO]: a", "[12:00:01 INFO]: b"]
+
+
+def test_新日志超出窗口时扩大窗口重新查询():
+    cursor = 日志游标()
+    assert cursor.解析(_输出("[12:00:00 INFO]: a"), _现在)
+    # 返回内容占满窗口且找不到锚点：两次查询之间的日志超出了窗口
+    overflow = _输出(*(f"[12:00:01 INFO]: {i:0>60}" for i in range(20)))
+    assert len(overflow.encode()) >= 1024
+    assert not cursor.解析(overflow, _现在)
+    assert cursor.窗口_kb == 2
+    assert _内容(cursor) == ["[12:00:00 INFO]: a"]
+
+
+def test_最大窗口仍找不到锚点时按缓存去重():
+    cursor = 日志游标(缓存行数=20000)
+    old = [f"[12:00:00 INFO]: old {i}" for i in range(3)]
+    assert cursor.解析(_输出(*old), _现在)
+    cursor.窗口_kb = 1024
+    cursor._锚点 = "已滚出窗口的锚点"
+    filler = [f"[12:00:01 INFO]: {i:0>100}" for i in range(10000)]
+    assert cursor.解析(_输出(*old, *filler), _现在)
+    assert _内容(cursor).count(old[0]) == 1
+    assert len(cursor.缓存) == 3 + 10000
+
+
+def test_日志被重置时缩小窗口且不重复追加():
+    cursor = 日志游标()
+    cursor.窗口_kb = 8
+    assert cursor.解析(_输出("[12:00:00 INFO]: a", "[12:00:01 INFO]: b"), _现在)
+    # 服务器重启清空了控制台：返回内容未占满窗口，锚点不在其中
+    assert cursor.解析(_输出("[12:00:00 INFO]: a", "[12:00:20 INFO]: Starting server"), _现在)
+    assert cursor.窗口_kb == 1
+    assert _内容(cursor) == ["[12:00:00 INFO]: a", "[12:00:01 INFO]: b", "[12:00:20 INFO]: Starting server"]
+
+
+def test_跨零点的日志属于前一天():
+    cursor = 日志游标()
+    log_time = int(datetime(2026, 10, 19, 0, 0, 10).timestamp() * 1000)
+    assert cursor.解析(_输出("[23:59:59 INFO]: before", "[00:00:05 INFO]: after"), log_time)
+    before, after = cursor.缓存
+    assert before.时间戳 == int(datetime(2026, 10, 18, 23, 59, 59).timestamp() * 1000)
+    assert after.时间戳 == int(datetime(2026, 10, 19, 0, 0, 5).timestamp() * 1000)
+
+
+def test_没有时间的行沿用上一行的时间():
+    cursor = 日志游标()
+    assert cursor.解析(_输出("[12:00:00 INFO]: a", "\x1b[31m    at stack\x1b[0m"), _现在)
+    first, second = cursor.缓存
+    assert second.时间戳 == first.时间戳
+    assert second.内容 == "    at stack"
@@ -0,0 +1,68 @@
+from src.plugins.mcsm.command import (
+    推断完成条件,
+    归类白名单日志,
+    结果_已添加,
+    结果_已删除,
+    结果_已存在,
+    结果_不存在,
+    结果_错误,
+    结果_未确认,
+)
+from src.plugins.mcsm.日志引擎 import 日志行
+
+
+def _状态(game_ids, lines, action="add"):
+    return {game_id: result["状态"] for game_id, result in 归类白名单日志(game_ids, lines, action).items()}
+
+
+def test_明确的成功输出():
+    lines = [
+        "[12:00:00 INFO]: Added Abc to the whitelist",
+        "[12:00:00 INFO]: Removed Def from the whitelist",
+    ]
+    assert _状态(["Abc"], lines) == {"Abc": 结果_已添加}
+    assert _状态(["Def"], lines, "remove") == {"Def": 结果_已删除}
+
+
+def test_失败命令的回显不算成功():
+    lines = [
+        "Unknown or incomplete command, see below for error",
+        "multilogin whitelist add Abc<--[HERE]",
+    ]
+    results = 归类白名单日志(["Abc"], lines)
+    assert results["Abc"]["状态"] == 结果_错误
+    assert results["Abc"]["日志"] == lines
+
+
+def test_只有回显时保持未确认():
+    assert _状态(["Abc"], ["> multilogin whitelist add Abc"]) == {"Abc": 结果_未确认}
+
+
+def test_回显旁的错误行不归入其他游戏ID():
+    lines = [
+        "[12:00:00 INFO]: Added Abc to the whitelist",
+        "Unknown or incomplete command, see below for error",
+        "multilogin whitelist add Def<--[HERE]",
+    ]
+    assert _状态(["Abc", "Def"], lines) == {"Abc": 结果_已添加, "Def": 结果_错误}
+
+
+def test_已存在和不存在():
+    assert _状态(["Abc"], ["Player Abc is already whitelisted"]) == {"Abc": 结果_已存在}
+    assert _状态(["Abc"], ["Player Abc is not whitelisted"], "remove") == {"Abc": 结果_不存在}
+
+
+def test_游戏ID按完整单词匹配():
+    assert _状态(["Abc"], ["Added Abcd to the whitelist"]) == {"Abc": 结果_未确认}
+
+
+def test_完成条件等待每个游戏ID的结果():
+    已完成 = 推断完成条件(["multilogin whitelist add Abc", "multilogin whitelist add Def"])
+    echo = [日志行(0, "> multilogin whitelist add Abc"), 日志行(0, "> multilogin whitelist add Def")]
+    assert not 已完成(echo)
+    assert not 已完成(echo + [日志行(0, "Added Abc to the whitelist")])
+    assert 已完成(echo + [日志行(0, "Added Abc to the whitelist"), 日志行(0, "Def is already whitelisted")])
+
+
+def test_非白名单命令没有完成条件():
+    assert 推断完成条件(["list"]) is None
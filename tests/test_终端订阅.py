@@ -0,0 +1,56 @@
+import asyncio
+import time
+from datetime import datetime
+
+import pytest
+
+from src.plugins.mcsm.command import 面板管理, 结果_已添加, 归类白名单日志
+from src.plugins.mcsm.终端订阅 import 本地终端源, 取消订阅, 获取订阅, 订阅终端
+
+
+@pytest.fixture
+async def 终端():
+    source = await 订阅终端("stream-uuid", "stream-daemon", 源=本地终端源("stream-uuid", "stream-daemon"))
+    yield source
+    await 取消订阅("stream-uuid", "stream-daemon")
+
+
+def _设置窗口(manager):
+    now = int(time.time() * 1000)
+    manager.start_time = now - 1000
+    manager.end_time = now + 5000
+    manager.command_time = now - now % 1000
+
+
+def _行(text):
+    return f"[{datetime.now():%H:%M:%S} INFO]: {text}\n"
+
+
+async def test_已订阅时从内存读取命令结果(终端):
+    assert 获取订阅("stream-uuid", "stream-daemon") is 终端
+    manager = 面板管理(uuid="stream-uuid", daemonid="stream-daemon")
+    _设置窗口(manager)
+    # 推送可能在任意位置截断，完整的行才写入缓存
+    line = _行("Added Abc to the whitelist")
+    终端.推送(line[:10])
+    assert len(await manager.查询日志(command="list")) == 0
+    终端.推送(line[10:])
+    result = await manager.查询日志(command="list")
+    assert [item.内容 for item in result.行] == [line.rstrip("\n")]
+
+
+async def test_推送新行时立即结束等待(终端):
+    manager = 面板管理(uuid="stream-uuid", daemonid="stream-daemon")
+    _设置窗口(manager)
+    command = "multilogin whitelist add Abc"
+    asyncio.get_running_loop().call_later(0.05, 终端.推送, _行("Added Abc to the whitelist"))
+    started = time.monotonic()
+    result = await manager.等待结果(command, timeout=3)
+    assert time.monotonic() - started < 1
+    assert 归类白名单日志(["Abc"], [line.内容 for line in result.行])["Abc"]["状态"] == 结果_已添加
+
+
+async def test_取消订阅后回退到HTTP查询(终端):
+    await 取消订阅("stream-uuid", "stream-daemon")
+    assert 获取订阅("stream-uuid", "stream-daemon") is None
+    assert not 终端.已连接
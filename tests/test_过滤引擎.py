@@ -0,0 +1,45 @@
+"""
+过滤引擎与原先四个过滤器的结果对比
+baseline_filters.py 是改写前的 src/plugins/qq/filters.py 原样副本
+"""
+
+import random
+
+import baseline_filters
+from src.plugins.feishu.记录 import 解析记录
+from src.plugins.qq.filters import 过滤引擎
+
+
+def 生成飞书记录(n, seed):
+    rng = random.Random(seed)
+    items = []
+    for i in range(n):
+        fields = {"总分": {"type": 2, "value": [80]}}
+        if rng.random() > 0.05:
+            fields["QQ号码"] = [{"type": "text", "text": str(rng.randint(10000, 10000 + n // 4))}]
+        if rng.random() > 0.05:
+            if rng.random() < 0.1:
+                game_id = rng.choice(["bad id!", "ab", "x" * 20, f"Steve_{rng.randint(0, n // 4)}"])
+            else:
+                game_id = f"Player_{rng.randint(0, n // 4)}"
+            fields["游戏ID"] = [{"type": "text", "text": game_id}]
+        # 创建时间取值范围很小，覆盖时间相同时保留先出现记录的情况
+        items.append({"record_id": f"rec{i}", "created_time": rng.randint(0, n // 10), "fields": fields})
+    return items
+
+
+def test_与原先四个过滤器结果一致():
+    for seed in range(5):
+        items = 生成飞书记录(2000, seed)
+        expected = [item["record_id"] for item in baseline_filters.apply_filters(items)]
+        actual = [record.record_id for record in 过滤引擎().输入(解析记录(items)).结果()]
+        assert actual == expected
+
+
+def test_分页输入结果一致():
+    items = 生成飞书记录(2000, 42)
+    engine = 过滤引擎()
+    for start in range(0, len(items), 500):
+        engine.输入(解析记录(items[start:start + 500]))
+    expected = [item["record_id"] for item in baseline_filters.apply_filters(items)]
+    assert [record.record_id for record in engine.结果()] == expected
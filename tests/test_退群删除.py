@@ -0,0 +1,29 @@
+from src.plugins.qq import 自动删除白名单
+
+
+class _查询:
+    def __init__(self, owners):
+        self.owners = owners
+
+    async def 根据游戏ID查询QQ号(self, game_ids):
+        return None if self.owners is None else {game_id: self.owners.get(game_id, []) for game_id in game_ids}
+
+
+class _名单:
+    def __init__(self, members):
+        self.members = members
+
+    async def 包含(self, bot, qq):
+        return qq in self.members
+
+
+async def test_仍被群内其他用户使用的游戏ID保留(monkeypatch):
+    monkeypatch.setattr(自动删除白名单, "获取名单", lambda group_id: _名单({"222"}))
+    query = _查询({"Shared": ["111", "222"], "Left": ["111", "333"], "Own": ["111"]})
+    kept = await 自动删除白名单._仍被使用的游戏ID(None, query, 111, ["Shared", "Left", "Own"])
+    assert kept == {"Shared": ["222"]}
+
+
+async def test_无法查询其他使用者时不保留(monkeypatch):
+    monkeypatch.setattr(自动删除白名单, "获取名单", lambda group_id: _名单({"222"}))
+    assert await 自动删除白名单._仍被使用的游戏ID(None, _查询(None), 111, ["Shared"]) == {}
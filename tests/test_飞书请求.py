@@ -0,0 +1,60 @@
+import httpx
+import pytest
+
+from src.plugins.feishu import 客户端
+from src.plugins.feishu.密钥管理 import token_manager
+
+
+@pytest.fixture
+def 飞书(monkeypatch, tmp_path):
+    """把共享客户端替换为按 handler 响应的本地传输，并隔离token状态"""
+    calls = []
+
+    def install(handler):
+        def record(request):
+            calls.append((request.url.path, request.headers.get("Authorization")))
+            return handler(request)
+
+        monkeypatch.setattr(
+            客户端._客户端,
+            "_client",
+            httpx.AsyncClient(base_url=客户端.BASE_URL, transport=httpx.MockTransport(record)),
+        )
+        return calls
+
+    monkeypatch.setattr(token_manager, "token_file", str(tmp_path / "token.json"))
+    monkeypatch.setattr(token_manager, "access_token", "old")
+    monkeypatch.setattr(token_manager, "expires_at", 2**40)
+    yield install
+    if token_manager._renew_task is not None:
+        token_manager._renew_task.cancel()
+        token_manager._renew_task = None
+
+
+async def test_token无效时换新token重试一次(飞书):
+    def handler(request):
+        if request.url.path.endswith("/tenant_access_token/internal/"):
+            return httpx.Response(200, json={"code": 0, "tenant_access_token": "new", "expire": 7200})
+        if request.headers["Authorization"] == "Bearer old":
+            return httpx.Response(400, json={"code": 99991663, "msg": "Invalid access token"})
+        return httpx.Response(200, json={"code": 0, "data": {}})
+
+    calls = 飞书(handler)
+    result = await 客户端.请求("POST", "/bitable/records/search", headers={"Authorization": "Bearer old"})
+
+    assert result["code"] == 0
+    assert token_manager.access_token == "new"
+    assert [auth for path, auth in calls if path.endswith("/search")] == ["Bearer old", "Bearer new"]
+
+
+async def test_换新token后仍无效时返回错误(飞书):
+    def handler(request):
+        if request.url.path.endswith("/tenant_access_token/internal/"):
+            return httpx.Response(200, json={"code": 0, "tenant_access_token": "new", "expire": 7200})
+        return httpx.Response(400, json={"code": 99991663, "msg": "Invalid access token"})
+
+    calls = 飞书(handler)
+    result = await 客户端.请求("POST", "/bitable/records/search", headers={"Authorization": "Bearer old"})
+
+    assert result["code"] == 99991663
+    assert len([path for path, _ in calls if path.endswith("/search")]) == 2